@@ -0,0 +1,104 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+DEFAULT_ALERTS_PATH = os.path.join(".cache", "alerts.sqlite3")
+ALERT_TTL = 604800  # 7 days in seconds
+BLOOM_FILTER_BITS = 1 << 20
+BLOOM_FILTER_HASHES = 4
+
+_alert_store = None
+_alert_store_lock = threading.Lock()
+
+
+class BloomFilter:
+    def __init__(self, size: int = BLOOM_FILTER_BITS, hashes: int = BLOOM_FILTER_HASHES):
+        self._bits = bytearray(size // 8)
+        self._size = size
+        self._hashes = hashes
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode(), digest_size=8 * self._hashes).digest()
+        for i in range(self._hashes):
+            yield int.from_bytes(digest[i * 8:(i + 1) * 8], "little") % self._size
+
+    def add(self, key: str) -> None:
+        for position in self._positions(key):
+            self._bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key: str) -> bool:
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+class AlertStore:
+    def __init__(self, path: str = DEFAULT_ALERTS_PATH, ttl: int = ALERT_TTL):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.ttl = ttl
+        # alerts queued for Discord but not delivered yet; they are only persisted once delivered
+        self._pending = set()
+        # shared by the comparison scan, the offer monitor thread and the Discord dispatcher
+        self._lock = threading.RLock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute("CREATE TABLE IF NOT EXISTS alerts (key TEXT PRIMARY KEY, expires_at REAL NOT NULL)")
+        self._connection.execute("DELETE FROM alerts WHERE expires_at <= ?", (time.time(),))
+        self._connection.commit()
+
+        # most alerts are new, so a bloom filter miss skips the database read entirely
+        self._bloom_filter = BloomFilter()
+        for key, in self._connection.execute("SELECT key FROM alerts"):
+            self._bloom_filter.add(key)
+
+    def seen(self, key: str) -> bool:
+        with self._lock:
+            if key not in self._bloom_filter:
+                return False
+
+            row = self._connection.execute(
+                "SELECT 1 FROM alerts WHERE key = ? AND expires_at > ?", (key, time.time())
+            ).fetchone()
+            return row is not None
+
+    def add(self, key: str) -> None:
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO alerts (key, expires_at) VALUES (?, ?)", (key, time.time() + self.ttl)
+            )
+            self._connection.commit()
+            self._bloom_filter.add(key)
+
+    def reserve(self, key: str) -> bool:
+        # claims an alert for sending unless it was delivered before or is already queued
+        with self._lock:
+            if key in self._pending or self.seen(key):
+                return False
+            self._pending.add(key)
+            return True
+
+    def confirm(self, key: str) -> None:
+        with self._lock:
+            self.add(key)
+            self._pending.discard(key)
+
+    def release(self, key: str) -> None:
+        # an alert that couldn't be delivered may be sent again by a later scan
+        with self._lock:
+            self._pending.discard(key)
+
+
+def get_alert_key(proof_of_integrity: str, alert_type: str, price) -> str:
+    return f"{proof_of_integrity}|{alert_type}|{price}"
+
+
+def get_alert_store() -> AlertStore:
+    global _alert_store
+
+    with _alert_store_lock:
+        if _alert_store is None:
+            _alert_store = AlertStore(os.getenv('ALERTS_PATH', DEFAULT_ALERTS_PATH))
+
+    return _alert_store
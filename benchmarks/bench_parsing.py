@@ -0,0 +1,113 @@
+# Compares the lxml extraction in pricecharting.py against the original full
+# BeautifulSoup("html.parser") parse on the saved fixture pages.
+#
+#   python -m benchmarks.bench_parsing [iterations]
+import os
+import re
+import sys
+import timeit
+
+from bs4 import BeautifulSoup
+
+from pricecharting import ResultTable, extract_pricecharting_information, get_product_url_from_results, parse_html
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+
+search_attributes = {
+    'Title': 'Pikachu',
+    'Card Number': '58',
+    'Set': 'Base Set',
+    'Language': 'English',
+    '1st Edition': False,
+}
+
+
+def read_fixture(name: str) -> bytes:
+    with open(os.path.join(FIXTURES, name), "rb") as f:
+        return f.read()
+
+
+def soup_extract_pricecharting_information(content: bytes, pricecharting_url: str) -> dict:
+    soup = BeautifulSoup(content, "html.parser")
+
+    card_information = {'prices': {}}
+    for ele in soup.find("div", id="full-prices").find_all('tr'):
+        cell = ele.find_all('td')
+        try:
+            price = float(cell[1].text.replace("$", ""))
+        except ValueError:
+            price = None
+        card_information['prices'][cell[0].text] = price
+
+    card_information['pricecharting_url'] = pricecharting_url
+    card_information['card_img'] = soup.find("div", id="product_details").find("img")['src']
+    card_information['liquidity_info'] = [a.text for a in soup.find('tr', class_='sales_volume').find_all('a')]
+
+    return card_information
+
+
+def soup_get_product_url_from_results(content: bytes, attributes: dict) -> str | None:
+    soup = BeautifulSoup(content, "html.parser")
+    rows = soup.find("table", id="games_table").find("tbody").find_all("tr", id=re.compile("^product-"))
+
+    res = []
+    for row in rows:
+        results = row.find_all("td")
+        card_url = results[ResultTable.IMAGE.value].find('a')['href'].strip()
+        title = results[ResultTable.TITLE.value].find('a').text.strip()
+        card_set = results[ResultTable.SET.value].text.strip()
+
+        if attributes['Title'].lower() not in title.lower() or \
+                ('Card Number' in attributes and attributes['Card Number'] not in title) or \
+                (attributes['Language'] == 'Japanese' and 'Japanese' not in card_set) or \
+                (attributes['Language'] == 'English' and 'Japanese' in card_set) or \
+                ('Promo' in attributes['Set'] and 'Promo' not in card_set) or \
+                (attributes['1st Edition'] and '1st Edition' not in title) or \
+                (not attributes['1st Edition'] and '1st Edition' in title):
+            continue
+
+        if attributes['Set'].lower() in card_set.lower():
+            res = [card_url]
+            break
+
+        res.append(card_url)
+
+    if len(res) == 1 and '/game/' in res[0]:
+        return res[0]
+
+
+def comparable(result):
+    if isinstance(result, dict):
+        return {key: val for key, val in result.items() if key != 'fetched_at'}
+    return result
+
+
+def bench(name: str, baseline, candidate, iterations: int) -> None:
+    assert comparable(baseline()) == comparable(candidate()), f"{name}: extraction results differ"
+
+    baseline_time = timeit.timeit(baseline, number=iterations) / iterations
+    candidate_time = timeit.timeit(candidate, number=iterations) / iterations
+
+    print(f"{name}: html.parser {baseline_time * 1000:.2f} ms, lxml {candidate_time * 1000:.2f} ms "
+          f"({baseline_time / candidate_time:.1f}x faster)")
+
+
+def main(*argv):
+    iterations = int(argv[1]) if len(argv) > 1 else 50
+
+    product = read_fixture("product.html")
+    search = read_fixture("search.html")
+    url = "https://www.pricecharting.com/game/pokemon-base-set/charizard-4"
+
+    bench("product page",
+          lambda: soup_extract_pricecharting_information(product, url),
+          lambda: extract_pricecharting_information(url, product),
+          iterations)
+    bench("search results",
+          lambda: soup_get_product_url_from_results(search, search_attributes),
+          lambda: get_product_url_from_results(parse_html(search), search_attributes),
+          iterations)
+
+
+if __name__ == "__main__":
+    main(*sys.argv)
@@ -0,0 +1,129 @@
+# Runs main.driver() and with_caching.driver() end to end against the local
+# stand-in server in stub_server.py, so throughput and latency can be compared
+# between changes without touching the real sites.
+#
+#   python -m benchmarks.bench_replay [total assets] [unique cards] [latency seconds] [pricecharting requests/s]
+import os
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+from benchmarks.stub_server import StubServer
+
+CATCH_UP_ASSETS = 300
+STALE_AGE = 345600  # 4 days in seconds, past the revalidation window
+
+
+def reset_stores() -> None:
+    # the catalog, alert store and price history are opened once per process relative to the working directory,
+    # and each driver starts with fresh rate limits
+    import alerts
+    import catalog
+    import history
+    import ratelimit
+
+    alerts._alert_store = None
+    catalog._catalog = None
+    history._price_history = None
+    ratelimit._limiters.clear()
+
+
+def age_cache(seconds: float) -> None:
+    # pretends every cached lookup was fetched that much earlier, as if the next sweep ran days later
+    from cache import DEFAULT_CACHE_PATH
+
+    connection = sqlite3.connect(DEFAULT_CACHE_PATH)
+    with connection:
+        connection.execute(
+            "UPDATE cache SET value = json_set(value, '$.fetched_at', json_extract(value, '$.fetched_at') - ?)",
+            (seconds,)
+        )
+    connection.close()
+
+
+def run(name: str, module, driver, stub: StubServer) -> dict:
+    import http_client
+    import notifications
+
+    evaluated = []
+    evaluate_page = module.evaluate_page
+
+    def timed_evaluate_page(*args, **kwargs):
+        evaluation = evaluate_page(*args, **kwargs)
+        evaluated.extend([time.perf_counter()] * int(evaluation['resolved'].sum()))
+        return evaluation
+
+    module.evaluate_page = timed_evaluate_page
+    stub.counts.clear()
+    reset_stores()
+
+    start = time.perf_counter()
+    try:
+        driver()
+        notifications.flush()
+    finally:
+        module.evaluate_page = evaluate_page
+        http_client.close()
+    elapsed = time.perf_counter() - start
+
+    latencies = [timestamp - start for timestamp in evaluated]
+    percentiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+
+    return {
+        'name': name,
+        'elapsed': elapsed,
+        'evaluated': len(evaluated),
+        'assets_per_second': len(evaluated) / elapsed,
+        'p50': percentiles[49] if percentiles else 0,
+        'p99': percentiles[98] if percentiles else 0,
+        'requests': dict(stub.counts),
+    }
+
+
+def print_report(result: dict) -> None:
+    print(f"{result['name']}: {result['evaluated']} assets evaluated in {result['elapsed']:.2f}s "
+          f"({result['assets_per_second']:.1f} assets/s), time to evaluation "
+          f"p50 {result['p50']:.2f}s / p99 {result['p99']:.2f}s")
+    for route, count in sorted(result['requests'].items()):
+        print(f"    {route}: {count}")
+
+
+def main(total_assets: int = 1050, unique_cards: int = 200, latency: float = 0.05, rate_limit: float = 0) -> None:
+    stub = StubServer(total_assets, unique_cards, latency, rate_limit).start()
+
+    os.environ.update(stub.environment())
+    # an unreachable Redis makes get_cache() fall back to SQLite in the working directory
+    os.environ['REDIS_URL'] = "redis://127.0.0.1:1"
+
+    import main as main_driver
+    import with_caching
+    from watermark import WatermarkStore, get_query_key
+
+    results = []
+    cwd = os.getcwd()
+
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            os.chdir(directory)
+            WatermarkStore().set(get_query_key(main_driver.default_url), stub.get_serial(CATCH_UP_ASSETS))
+            results.append(run("main.driver (catch-up, cold cache)", main_driver, main_driver.driver, stub))
+
+        with tempfile.TemporaryDirectory() as directory:
+            os.chdir(directory)
+            results.append(run("with_caching.driver (cold cache)", with_caching, with_caching.driver, stub))
+            results.append(run("with_caching.driver (warm cache)", with_caching, with_caching.driver, stub))
+            age_cache(STALE_AGE)
+            results.append(run("with_caching.driver (stale cache)", with_caching, with_caching.driver, stub))
+    finally:
+        os.chdir(cwd)
+        stub.stop()
+
+    print()
+    for result in results:
+        print_report(result)
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:3]], *[float(arg) for arg in sys.argv[3:5]])
@@ -0,0 +1,35 @@
+# Refreshes the replay fixtures from the live sites: one Courtyard query page,
+# one PriceCharting search page and the product page of its first result.
+#
+#   python -m benchmarks.record [courtyard marketplace url]
+import json
+import os
+import sys
+
+import http_client
+from courtyard import get_courtyard_page, process_courtyard_url
+from main import default_url
+from pricecharting import get_search_result_rows, get_search_url, headers, parse_html
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+
+
+def write_fixture(name: str, content: bytes) -> None:
+    with open(os.path.join(FIXTURES, name), "wb") as f:
+        f.write(content)
+    print(f"Recorded {name} ({len(content)} bytes)")
+
+
+def record(url: str = default_url, search: str = "Pikachu+58") -> None:
+    data = get_courtyard_page(process_courtyard_url(url, limit=20))
+    write_fixture("courtyard_query.json", json.dumps(data, indent=2).encode())
+
+    search_page = http_client.get(get_search_url(search), headers=headers).content
+    write_fixture("search.html", search_page)
+
+    product_url = get_search_result_rows(parse_html(search_page))[0][0]
+    write_fixture("product.html", http_client.get(product_url, headers=headers).content)
+
+
+if __name__ == "__main__":
+    record(*sys.argv[1:2])
@@ -0,0 +1,221 @@
+# Local stand-in for api.courtyard.io, pricecharting.com, Discord and GitHub that
+# replays the saved fixtures, so the drivers can run end to end without network.
+import asyncio
+import copy
+import json
+import os
+import re
+import threading
+import time
+from collections import Counter, deque
+
+from aiohttp import web
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+PRICECHARTING_HOST = "https://www.pricecharting.com"
+PRODUCT_ETAG = '"fixture"'
+
+
+def read_fixture(name: str) -> bytes:
+    with open(os.path.join(FIXTURES, name), "rb") as f:
+        return f.read()
+
+
+def get_attribute(asset: dict, name: str):
+    for attribute in asset['attributes']:
+        if attribute['name'] == name:
+            return attribute
+
+
+def slugify(text: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "-", text.lower()).strip("-")
+
+
+class StubServer:
+    def __init__(self, total_assets: int = 1050, unique_cards: int = 200, latency: float = 0.05,
+                 rate_limit: float = 0, host: str = "127.0.0.1", port: int = 0):
+        self.total_assets = total_assets
+        self.latency = latency
+        # PriceCharting requests per second above which the stand-in answers 429, 0 for no limit
+        self.rate_limit = rate_limit
+        self._recent = deque()
+        self.host = host
+        self.port = port
+        self.counts = Counter()
+
+        self._templates = json.loads(read_fixture("courtyard_query.json"))['assets']
+        self._variants = max(1, unique_cards // len(self._templates))
+        self._product = read_fixture("product.html")
+        self._search = read_fixture("search.html")
+        self._cards = {}
+        for i in range(len(self._templates) * self._variants):
+            asset = self.get_asset(i)
+            self._cards[self.get_search_query(asset)] = asset
+
+        self._loop = None
+        self._runner = None
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def get_serial(self, index: int) -> str:
+        # newest listings first, like the listingDate:desc sort
+        return str(90000000 - index)
+
+    def get_asset(self, index: int) -> dict:
+        asset = copy.deepcopy(self._templates[index % len(self._templates)])
+        variant = (index // len(self._templates)) % self._variants
+
+        card_number = get_attribute(asset, 'Card Number')
+        if card_number and variant:
+            card_number['value'] = str(int(card_number['value']) + variant * 1000)
+
+        get_attribute(asset, 'Serial')['value'] = self.get_serial(index)
+        asset['proof_of_integrity'] = f"0x{index:064x}"
+
+        # spread listing prices so a share of the listings clears the alert thresholds
+        listing_price = asset['listing_data'][0]['price']['amount']
+        listing_price['usd'] = round(listing_price['usd'] * (0.4 + (index * 7919 % 100) / 100), 2)
+
+        return asset
+
+    def get_search_query(self, asset: dict) -> str:
+        title = next(a['value'] for a in asset['attributes'] if 'Title' in a['name'])
+        card_number = get_attribute(asset, 'Card Number')
+        number = re.search(r"\d+(?:\.\d+)?", card_number['value'])[0].lstrip("0") if card_number else ""
+        return f"{title} {number}".strip().lower()
+
+    def get_product_path(self, asset: dict) -> str:
+        card_set = get_attribute(asset, 'Set')['value']
+        return f"/game/pokemon-{slugify(card_set)}/{slugify(self.get_search_query(asset))}"
+
+    def render_search_results(self, asset: dict) -> bytes:
+        title = next(a['value'] for a in asset['attributes'] if 'Title' in a['name'])
+        card_number = get_attribute(asset, 'Card Number')
+        number = card_number['value'].lstrip("0") if card_number else ""
+        first_edition = any(a['name'] == "" and a['value'] == '1st Edition' for a in asset['attributes'])
+        language = get_attribute(asset, 'Language')['value']
+        card_set = get_attribute(asset, 'Set')['value']
+
+        row_title = f"{title} #{number}" + (" 1st Edition" if first_edition else "")
+        row_set = "Pokemon " + ("Japanese " if language == 'Japanese' else "") + card_set
+        product_url = self.url + self.get_product_path(asset)
+
+        row = (f'<tr id="product-200000" data-product="200000"><td class="image"><a href="{product_url}"></a></td>'
+               f'<td class="title"><a href="{product_url}">{row_title}</a></td><td class="console">{row_set}</td>'
+               f'<td class="price numeric used_price"><span class="js-price">$45.00</span></td><td></td><td></td><td></td></tr>')
+
+        page = self._search.decode().replace(PRICECHARTING_HOST, self.url)
+        page = re.sub(r'<tr id="product-200000".*?</tr>', lambda _: row, page, flags=re.DOTALL)
+        return page.encode()
+
+    async def _delay(self) -> None:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    def _throttle(self) -> web.Response | None:
+        if not self.rate_limit:
+            return
+
+        now = time.monotonic()
+        while self._recent and self._recent[0] <= now - 1:
+            self._recent.popleft()
+        if len(self._recent) >= self.rate_limit:
+            self.counts['pricecharting_throttled'] += 1
+            return web.Response(status=429, headers={'Retry-After': '1'})
+        self._recent.append(now)
+
+    async def courtyard_query(self, request: web.Request) -> web.Response:
+        self.counts['courtyard'] += 1
+        await self._delay()
+
+        offset = int(request.query.get('offset', 0))
+        limit = int(request.query.get('limit', 100))
+        assets = [self.get_asset(i) for i in range(offset, min(offset + limit, self.total_assets))]
+
+        return web.json_response({'total': self.total_assets, 'assets': assets})
+
+    async def pricecharting_search(self, request: web.Request) -> web.Response:
+        self.counts['pricecharting_search'] += 1
+        await self._delay()
+        throttled = self._throttle()
+        if throttled:
+            return throttled
+
+        # with_caching.py searches with the card number's leading zeros, main.py without
+        query = " ".join(word.lstrip("0") or word for word in request.query.get('q', '').split()).lower()
+        asset = self._cards.get(query)
+        if asset is None:
+            return web.Response(body=self._search.decode().replace(PRICECHARTING_HOST, self.url), content_type='text/html')
+
+        # half of the searches resolve straight to the product page, like an exact PriceCharting match does
+        if int(self.get_search_query(asset).rsplit(" ", 1)[-1] or 0) % 2 == 0:
+            raise web.HTTPFound(self.get_product_path(asset))
+
+        return web.Response(body=self.render_search_results(asset), content_type='text/html')
+
+    async def pricecharting_product(self, request: web.Request) -> web.Response:
+        self.counts['pricecharting_product'] += 1
+        await self._delay()
+        throttled = self._throttle()
+        if throttled:
+            return throttled
+
+        if request.headers.get('If-None-Match') == PRODUCT_ETAG:
+            self.counts['pricecharting_not_modified'] += 1
+            return web.Response(status=304, headers={'ETag': PRODUCT_ETAG})
+
+        return web.Response(body=self._product, content_type='text/html', headers={'ETag': PRODUCT_ETAG})
+
+    async def discord_webhook(self, request: web.Request) -> web.Response:
+        self.counts['discord'] += 1
+        body = await request.json()
+        self.counts['discord_embeds'] += len(body.get('embeds', []))
+        return web.Response(status=204, headers={'X-RateLimit-Remaining': '4', 'X-RateLimit-Reset-After': '1'})
+
+    async def github_variable(self, request: web.Request) -> web.Response:
+        self.counts['github'] += 1
+        return web.Response(status=204)
+
+    def _serve(self, started: threading.Event) -> None:
+        app = web.Application()
+        app.router.add_get('/index/query', self.courtyard_query)
+        app.router.add_get('/search-products', self.pricecharting_search)
+        app.router.add_get('/game/{console}/{product}', self.pricecharting_product)
+        app.router.add_post('/webhooks/{webhook_id}/{webhook_token}', self.discord_webhook)
+        app.router.add_patch('/repos/{tail:.*}', self.github_variable)
+
+        self._loop = asyncio.new_event_loop()
+        self._runner = web.AppRunner(app)
+        self._loop.run_until_complete(self._runner.setup())
+        site = web.TCPSite(self._runner, self.host, self.port)
+        self._loop.run_until_complete(site.start())
+        self.port = self._runner.addresses[0][1]
+
+        started.set()
+        self._loop.run_forever()
+
+    def start(self) -> "StubServer":
+        started = threading.Event()
+        self._thread = threading.Thread(target=self._serve, args=(started,), daemon=True)
+        self._thread.start()
+        started.wait()
+        return self
+
+    def stop(self) -> None:
+        asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+
+    def environment(self) -> dict:
+        return {
+            'COURTYARD_API_URL': self.url,
+            'PRICECHARTING_URL': self.url,
+            'DISCORD_API_URL': self.url,
+            'DISCORD_WEBHOOK_COURTYARD_ID': 'courtyard',
+            'DISCORD_WEBHOOK_COURTYARD_TOKEN': 'token',
+            'DISCORD_WEBHOOK_OFFERS_ID': 'offers',
+            'DISCORD_WEBHOOK_OFFERS_TOKEN': 'token',
+        }
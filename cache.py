@@ -0,0 +1,165 @@
+import json
+import os
+import sqlite3
+import time
+from collections import OrderedDict
+
+import redis
+
+import metrics
+from redis_cache import RedisCache
+
+# entries outlive their 3-day freshness window so they can be revalidated instead of refetched
+DEFAULT_EXPIRATION_TIME = 1209600  # 14 days in seconds
+DEFAULT_CACHE_PATH = os.path.join(".cache", "pricecharting.sqlite3")
+DEFAULT_REDIS_URL = "redis://localhost:6379"
+
+
+class MemoryCache:
+    def __init__(self, max_entries: int = 2048, expiration_time: int = DEFAULT_EXPIRATION_TIME):
+        self._entries = OrderedDict()
+        self.max_entries = max_entries
+        self.expiration_time = expiration_time
+
+    def get(self, key: str):
+        entry = self._entries.get(key)
+        if entry is None:
+            return
+
+        expires_at, val = entry
+        if expires_at <= time.time():
+            del self._entries[key]
+            return
+
+        self._entries.move_to_end(key)
+        return val
+
+    def set(self, key: str, val: dict) -> None:
+        self._entries[key] = (time.time() + self.expiration_time, val)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get_many(self, keys: list) -> list:
+        return [self.get(key) for key in keys]
+
+    def set_many(self, items: dict) -> None:
+        for key, val in items.items():
+            self.set(key, val)
+
+
+class SQLiteCache:
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, expiration_time: int = DEFAULT_EXPIRATION_TIME):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._connection = sqlite3.connect(path)
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._connection.execute("DELETE FROM cache WHERE expires_at <= ?", (time.time(),))
+        self._connection.commit()
+        self.expiration_time = expiration_time
+
+    def get(self, key: str):
+        return self.get_many([key])[0]
+
+    def set(self, key: str, val: dict) -> None:
+        self.set_many({key: val})
+
+    def get_many(self, keys: list) -> list:
+        if not keys:
+            return []
+
+        placeholders = ",".join("?" * len(keys))
+        rows = self._connection.execute(
+            f"SELECT key, value FROM cache WHERE key IN ({placeholders}) AND expires_at > ?",
+            (*keys, time.time())
+        )
+        found = {key: json.loads(value) for key, value in rows}
+        return [found.get(key) for key in keys]
+
+    def set_many(self, items: dict) -> None:
+        if not items:
+            return
+
+        expires_at = time.time() + self.expiration_time
+        self._connection.executemany(
+            "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+            [(key, json.dumps(val), expires_at) for key, val in items.items()]
+        )
+        self._connection.commit()
+
+
+class TieredCache:
+    def __init__(self, *tiers):
+        self.tiers = tiers
+        self.stats = {type(tier).__name__: {'hits': 0, 'misses': 0} for tier in tiers}
+        self.revalidations = {'not_modified': 0, 'modified': 0}
+
+    def get(self, key: str):
+        return self.get_many([key])[0]
+
+    def set(self, key: str, val: dict) -> None:
+        self.set_many({key: val})
+
+    def get_many(self, keys: list) -> list:
+        results = [None] * len(keys)
+        missing = list(range(len(keys)))
+
+        for depth, tier in enumerate(self.tiers):
+            if not missing:
+                break
+
+            name = type(tier).__name__
+            stats = self.stats[name]
+            found = {}
+
+            for i, val in zip(missing, tier.get_many([keys[i] for i in missing])):
+                if val is None:
+                    stats['misses'] += 1
+                else:
+                    stats['hits'] += 1
+                    results[i] = val
+                    found[keys[i]] = val
+
+            # promote hits into the faster tiers in front of this one
+            for front in self.tiers[:depth]:
+                front.set_many(found)
+
+            metrics.increment('cache_hits', len(found), tier=name)
+            metrics.increment('cache_misses', len(missing) - len(found), tier=name)
+
+            missing = [i for i in missing if results[i] is None]
+
+        return results
+
+    def set_many(self, items: dict) -> None:
+        for tier in self.tiers:
+            tier.set_many(items)
+
+    def record_revalidation(self, not_modified: bool) -> None:
+        result = 'not_modified' if not_modified else 'modified'
+        self.revalidations[result] += 1
+        metrics.increment('revalidations', result=result)
+
+    def report(self) -> str:
+        tiers = ", ".join(f"{name}: {stats['hits']} hits / {stats['misses']} misses" for name, stats in self.stats.items())
+        return (f"{tiers}, revalidations: {self.revalidations['not_modified']} not modified / "
+                f"{self.revalidations['modified']} downloaded")
+
+
+def get_cache() -> TieredCache:
+    redis_client = redis.Redis.from_url(os.getenv('REDIS_URL', DEFAULT_REDIS_URL), socket_connect_timeout=1)
+
+    try:
+        # a missing key is fine, but a server without RedisJSON rejects the command
+        redis_client.json().get("cache:probe", "$")
+        backend = RedisCache(client=redis_client, expiration_time=DEFAULT_EXPIRATION_TIME)
+    except redis.exceptions.RedisError as e:
+        print(f"Redis unavailable, caching in SQLite: {e!r}")
+        backend = SQLiteCache(os.getenv('CACHE_PATH', DEFAULT_CACHE_PATH))
+
+    return TieredCache(MemoryCache(), backend)
@@ -0,0 +1,71 @@
+import os
+import re
+import sqlite3
+
+DEFAULT_CATALOG_PATH = os.path.join(".cache", "catalog.sqlite3")
+
+_catalog = None
+
+
+def tokenize(text: str) -> list:
+    return re.findall(r"[a-z0-9]+", text.lower())
+
+
+class ProductCatalog:
+    def __init__(self, path: str = DEFAULT_CATALOG_PATH):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._connection = sqlite3.connect(path)
+        self._connection.executescript("""
+            CREATE TABLE IF NOT EXISTS products (url TEXT PRIMARY KEY, title TEXT NOT NULL, card_set TEXT NOT NULL);
+            CREATE TABLE IF NOT EXISTS tokens (token TEXT NOT NULL, url TEXT NOT NULL, PRIMARY KEY (token, url));
+            CREATE TABLE IF NOT EXISTS resolved (card_key TEXT PRIMARY KEY, url TEXT NOT NULL);
+        """)
+        self._connection.commit()
+
+    def get_resolved(self, card_key: str) -> str | None:
+        row = self._connection.execute("SELECT url FROM resolved WHERE card_key = ?", (card_key,)).fetchone()
+        if row:
+            return row[0]
+
+    def set_resolved(self, card_key: str, url: str) -> None:
+        self._connection.execute("INSERT OR REPLACE INTO resolved (card_key, url) VALUES (?, ?)", (card_key, url))
+        self._connection.commit()
+
+    def add_products(self, rows: list) -> None:
+        if not rows:
+            return
+
+        self._connection.executemany(
+            "INSERT OR REPLACE INTO products (url, title, card_set) VALUES (?, ?, ?)", rows
+        )
+        self._connection.executemany(
+            "INSERT OR IGNORE INTO tokens (token, url) VALUES (?, ?)",
+            [(token, url) for url, title, _ in rows for token in set(tokenize(title))]
+        )
+        self._connection.commit()
+
+    def find_products(self, tokens: list) -> list:
+        # products whose title contains every token
+        tokens = list(set(tokens))
+        if not tokens:
+            return []
+
+        placeholders = ",".join("?" * len(tokens))
+        return self._connection.execute(
+            f"""SELECT products.url, products.title, products.card_set FROM products
+                JOIN (SELECT url FROM tokens WHERE token IN ({placeholders})
+                      GROUP BY url HAVING COUNT(*) = ?) AS matched ON matched.url = products.url""",
+            (*tokens, len(tokens))
+        ).fetchall()
+
+
+def get_catalog() -> ProductCatalog:
+    global _catalog
+
+    if _catalog is None:
+        _catalog = ProductCatalog(os.getenv('CATALOG_PATH', DEFAULT_CATALOG_PATH))
+
+    return _catalog
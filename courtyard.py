@@ -0,0 +1,102 @@
+import os
+import re
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+from typing import Iterable, Iterator
+
+import ijson
+import requests
+import urllib3
+
+import http_client
+import metrics
+
+COURTYARD_API_URL = os.getenv('COURTYARD_API_URL', "https://api.courtyard.io")
+COURTYARD_PAGE_SIZE = 100
+COURTYARD_PREFETCH_PAGES = 4
+# streamed pages are decoded asset by asset, so they can be much larger without holding the whole page
+COURTYARD_STREAM_PAGE_SIZE = 500
+
+headers = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/126.0.0.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7',
+    'Accept-Language': 'en-GB,en-US;q=0.9,en;q=0.8,zh-TW;q=0.7,zh-CN;q=0.6,zh;q=0.5',
+}
+
+
+def process_courtyard_url(courtyard_url: str, offset: int = 0, limit: int = COURTYARD_PAGE_SIZE) -> str:
+    params = courtyard_url.split(re.search(r"page=\d+&", courtyard_url)[0])[1]
+    converted_url = f"{COURTYARD_API_URL}/index/query?{params}&offset={offset}&limit={limit}&sortBy=listingDate%3Adesc"
+    return converted_url
+
+
+def get_courtyard_data(courtyard_url: str) -> requests.Response:
+    return http_client.get(courtyard_url, headers=headers)
+
+
+def get_courtyard_page(courtyard_url: str) -> dict:
+    with metrics.timer('courtyard_fetch'):
+        return get_courtyard_data(courtyard_url).json()
+
+
+def iter_courtyard_pages(url: str, offsets: Iterable[int], limit: int = COURTYARD_PAGE_SIZE,
+                         prefetch: int = COURTYARD_PREFETCH_PAGES) -> Iterator[list]:
+    # Keeps up to `prefetch` pages in flight while the caller works through the current one,
+    # yielding each page's assets in offset order.
+    offsets = iter(offsets)
+    executor = ThreadPoolExecutor(max_workers=prefetch)
+    pending = deque()
+
+    def submit_next() -> None:
+        offset = next(offsets, None)
+        if offset is not None:
+            pending.append(executor.submit(get_courtyard_page, process_courtyard_url(url, offset, limit)))
+
+    try:
+        for _ in range(prefetch):
+            submit_next()
+
+        while pending:
+            data = pending.popleft().result()
+            submit_next()
+
+            if not data.get('assets'):
+                break
+
+            yield data['assets']
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def stream_courtyard_assets(courtyard_url: str) -> Iterator[dict]:
+    # only the request is timed, since the body is decoded as the caller works through the assets
+    with metrics.timer('courtyard_fetch'):
+        response = http_client.get(courtyard_url, headers=headers, stream=True)
+
+    try:
+        response.raise_for_status()
+        response.raw.decode_content = True
+        yield from ijson.items(response.raw, 'assets.item', use_float=True)
+    except ijson.JSONError as e:
+        raise ValueError(f"Malformed Courtyard response: {e}") from e
+    except urllib3.exceptions.HTTPError as e:
+        raise requests.ConnectionError(e) from e
+    finally:
+        response.close()
+
+
+def iter_courtyard_assets_streaming(url: str, offset: int = 0,
+                                    limit: int = COURTYARD_STREAM_PAGE_SIZE) -> Iterator[dict]:
+    # advances by what each page actually held, in case the API caps `limit` below what was asked for
+    while True:
+        received = 0
+        # closing the generator early, e.g. at the watermark, drops the rest of the response
+        with closing(stream_courtyard_assets(process_courtyard_url(url, offset, limit))) as assets:
+            for asset in assets:
+                received += 1
+                yield asset
+
+        if not received:
+            return
+        offset += received
@@ -0,0 +1,104 @@
+import re
+from functools import lru_cache
+
+import numpy as np
+
+SELLING_FEE = 0.065
+VOLUME_COLUMNS = {
+    '': 0,
+    '7': 1,
+    '8': 2,
+    '9': 3,
+    '9.5': 4,
+    '10': 5,
+}
+
+
+@lru_cache(maxsize=None)
+def parse_grade(grade: str) -> str:
+    # a sweep only ever sees a handful of distinct grade strings
+    match = re.search(r"\d+(?:\.\d+)?", grade)
+    return match[0] if match else ""
+
+
+def get_listing_price(asset: dict):
+    return asset['listing_data'][0]['price']['amount']['usd']
+
+
+def get_best_offer(asset: dict):
+    return max((offer['price']['netAmount']['usd'] for offer in asset.get('offer_data') or ()), default=0)
+
+
+def is_offer_arbitrage(listing_price, best_offer):
+    # buying the listing and accepting the offer clears Courtyard's selling fee; works on floats and arrays alike
+    return (best_offer > 0) & (best_offer >= listing_price * (1 + SELLING_FEE))
+
+
+def get_reference_price(pricecharting_prices: dict, grader: str, grade: str) -> float:
+    price = pricecharting_prices.get(f"{grader} {grade}", pricecharting_prices.get(f"Grade {grade}"))
+    return np.nan if price is None else price
+
+
+def join_reference_data(records: list, lookups: list) -> tuple:
+    # every resolved card is a row and every grading a column, so the per-asset
+    # price and volume lookups become a single gather over two small matrices
+    card_rows = np.full(len(lookups), -1, dtype=np.intp)
+    grading_columns = np.zeros(len(lookups), dtype=np.intp)
+    volume_columns = np.zeros(len(lookups), dtype=np.intp)
+    cards = {}
+    gradings = {}
+
+    for i, (record, pricecharting_information) in enumerate(zip(records, lookups)):
+        if not pricecharting_information:
+            continue
+
+        card_rows[i] = cards.setdefault(id(pricecharting_information), (len(cards), pricecharting_information))[0]
+        grading_columns[i] = gradings.setdefault((record.grader, record.grade_label), len(gradings))
+        volume_columns[i] = VOLUME_COLUMNS.get(record.grade_label, len(VOLUME_COLUMNS))
+
+    prices = np.full((len(cards), len(gradings)), np.nan)
+    # the extra column holds None for grades without a volume figure
+    volumes = np.full((len(cards), len(VOLUME_COLUMNS) + 1), None, dtype=object)
+
+    for row, pricecharting_information in cards.values():
+        for (grader, grade), column in gradings.items():
+            prices[row, column] = get_reference_price(pricecharting_information['prices'], grader, grade)
+
+        liquidity_info = pricecharting_information['liquidity_info'][:len(VOLUME_COLUMNS)]
+        volumes[row, :len(liquidity_info)] = liquidity_info
+
+    resolved = card_rows >= 0
+    reference_prices = np.full(len(lookups), np.nan)
+    reference_prices[resolved] = prices[card_rows[resolved], grading_columns[resolved]]
+    volume = np.full(len(lookups), None, dtype=object)
+    volume[resolved] = volumes[card_rows[resolved], volume_columns[resolved]]
+
+    return resolved, reference_prices, volume
+
+
+def evaluate_page(records: list, lookups: list, minimum_price_difference: float,
+                  smoothed_prices: np.ndarray | None = None) -> dict:
+    listing_prices = np.fromiter((record.price for record in records), dtype=float, count=len(records))
+    best_offers = np.fromiter((record.best_offer for record in records), dtype=float, count=len(records))
+    resolved, live_prices, volume = join_reference_data(records, lookups)
+
+    # a smoothed reference, where there is history for it, stops a single price spike from alerting
+    reference_prices = live_prices if smoothed_prices is None else np.where(np.isnan(smoothed_prices), live_prices, smoothed_prices)
+
+    # NaN reference prices compare False, so unpriced gradings never alert
+    priced = resolved & (reference_prices > 0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        spread = 1 - reference_prices / listing_prices
+
+    return {
+        'listing_price': listing_prices,
+        'best_offer': best_offers,
+        'reference_price': reference_prices,
+        'live_reference_price': live_prices,
+        'volume': volume,
+        'spread': spread,
+        'resolved': resolved,
+        'priced': priced,
+        'deal': priced & (reference_prices >= listing_prices * (1 + minimum_price_difference)),
+        'offer': is_offer_arbitrage(listing_prices, best_offers),
+    }
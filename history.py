@@ -0,0 +1,140 @@
+import os
+import sqlite3
+import statistics
+import time
+
+import numpy as np
+
+
+DEFAULT_HISTORY_PATH = os.path.join(".cache", "history.sqlite3")
+PRICECHARTING = 'pricecharting'
+COURTYARD = 'courtyard'
+DAY = 86400  # seconds
+REFERENCE_MEDIAN_DAYS = 0  # compare against the live price unless a median window is configured
+
+_price_history = None
+
+
+class PriceHistory:
+    def __init__(self, path: str = DEFAULT_HISTORY_PATH):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._connection = sqlite3.connect(path)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        # the primary key doubles as the only index: every query but popular_cards is a range scan over one card's grading.
+        # `listing` keeps apart listings of the same card and grading seen on one page; it is empty for PriceCharting
+        self._connection.execute(
+            """CREATE TABLE IF NOT EXISTS observations (
+                card_key TEXT NOT NULL,
+                grading TEXT NOT NULL,
+                source TEXT NOT NULL,
+                observed_at REAL NOT NULL,
+                listing TEXT NOT NULL,
+                price REAL NOT NULL,
+                PRIMARY KEY (card_key, grading, source, observed_at, listing)
+            ) WITHOUT ROWID"""
+        )
+        self._connection.commit()
+
+    def record(self, observations: list) -> None:
+        # observations are (card_key, grading, source, observed_at, listing, price) tuples
+        if not observations:
+            return
+
+        self._connection.executemany("INSERT OR IGNORE INTO observations VALUES (?, ?, ?, ?, ?, ?)", observations)
+        self._connection.commit()
+
+    def record_pricecharting(self, entries: dict) -> None:
+        self.record([
+            (card_key, grading, PRICECHARTING, pricecharting_information['fetched_at'], '', price)
+            for card_key, pricecharting_information in entries.items()
+            for grading, price in pricecharting_information['prices'].items()
+            if price is not None
+        ])
+
+    def record_courtyard(self, records: list, observed_at: float | None = None) -> None:
+        observed_at = observed_at or time.time()
+        self.record([
+            (record.card_key, record.grading, COURTYARD, observed_at, record.serial or '', record.price)
+            for record in records
+        ])
+
+    def latest(self, card_key: str, grading: str, source: str = PRICECHARTING) -> tuple | None:
+        return self._connection.execute(
+            """SELECT price, observed_at FROM observations WHERE card_key = ? AND grading = ? AND source = ?
+               ORDER BY observed_at DESC LIMIT 1""",
+            (card_key, grading, source)
+        ).fetchone()
+
+    def window(self, card_key: str, grading: str, days: float, source: str = PRICECHARTING) -> list:
+        return self._connection.execute(
+            """SELECT observed_at, price FROM observations
+               WHERE card_key = ? AND grading = ? AND source = ? AND observed_at >= ?
+               ORDER BY observed_at""",
+            (card_key, grading, source, time.time() - days * DAY)
+        ).fetchall()
+
+    def median(self, card_key: str, grading: str, days: float = 30, source: str = PRICECHARTING) -> float | None:
+        prices = [price for _, price in self.window(card_key, grading, days, source)]
+        if prices:
+            return statistics.median(prices)
+
+    def trend(self, card_key: str, grading: str, days: float = 30, source: str = PRICECHARTING) -> float | None:
+        # least-squares slope in price per day; None until there are two distinct observation times
+        n, sum_x, sum_y, sum_xy, sum_xx = self._connection.execute(
+            """SELECT COUNT(*), SUM(x), SUM(price), SUM(x * price), SUM(x * x) FROM (
+                   SELECT (observed_at - ?) / ? AS x, price FROM observations
+                   WHERE card_key = ? AND grading = ? AND source = ? AND observed_at >= ?)""",
+            (time.time(), DAY, card_key, grading, source, time.time() - days * DAY)
+        ).fetchone()
+
+        denominator = n * sum_xx - sum_x * sum_x if n else 0
+        if n < 2 or abs(denominator) < 1e-12:
+            return
+        return (n * sum_xy - sum_x * sum_y) / denominator
+
+    def popular_cards(self, days: float = 7, limit: int = 100) -> list:
+        # card keys ordered by how often their listings were seen on Courtyard, most-listed first
+        rows = self._connection.execute(
+            """SELECT card_key, COUNT(*) AS sightings FROM observations
+               WHERE source = ? AND observed_at >= ?
+               GROUP BY card_key ORDER BY sightings DESC LIMIT ?""",
+            (COURTYARD, time.time() - days * DAY, limit)
+        )
+        return [card_key for card_key, _ in rows]
+
+    def median_reference_prices(self, records: list, lookups: list, days: float) -> np.ndarray:
+        # mirrors the grading fallback of evaluation.get_reference_price
+        medians = {}
+        smoothed = np.full(len(records), np.nan)
+
+        for i, (record, pricecharting_information) in enumerate(zip(records, lookups)):
+            if not pricecharting_information:
+                continue
+
+            for grading in (record.grading, f"Grade {record.grade_label}"):
+                key = (record.card_key, grading)
+                if key not in medians:
+                    medians[key] = self.median(record.card_key, grading, days)
+                if medians[key] is not None:
+                    smoothed[i] = medians[key]
+                    break
+
+        return smoothed
+
+
+def get_smoothed_reference_prices(records: list, lookups: list) -> np.ndarray | None:
+    days = float(os.getenv('REFERENCE_MEDIAN_DAYS', REFERENCE_MEDIAN_DAYS))
+    if days > 0:
+        return get_price_history().median_reference_prices(records, lookups, days)
+
+
+def get_price_history() -> PriceHistory:
+    global _price_history
+
+    if _price_history is None:
+        _price_history = PriceHistory(os.getenv('PRICE_HISTORY_PATH', DEFAULT_HISTORY_PATH))
+
+    return _price_history
@@ -0,0 +1,203 @@
+import asyncio
+import random
+import threading
+from urllib.parse import urlsplit
+
+import aiohttp
+import requests
+import urllib3
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+import metrics
+import ratelimit
+
+MAX_RETRIES = 3
+BACKOFF_FACTOR = 0.5  # seconds
+BACKOFF_JITTER = 0.5  # seconds
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+TIMEOUT = 30  # seconds
+POOL_SIZE = 20
+
+# only advertises br/zstd when the matching decoder is installed
+ACCEPT_ENCODING = urllib3.util.make_headers(accept_encoding=True)['accept-encoding']
+
+_session = None
+_webhook_session = None
+# the offer monitor and the scan can both make the first request of a run
+_session_lock = threading.Lock()
+# each thread runs its own event loop and aiohttp session, so a background worker can fetch alongside the main thread
+_local = threading.local()
+
+
+class RateLimitedRetry(Retry):
+    # urllib3 resends retried requests itself, so the host's limiter sees each retried response here and the
+    # resend waits for a token like any other request
+    host = None
+
+    def increment(self, method=None, url=None, response=None, error=None, _pool=None, _stacktrace=None):
+        # raises once the retries run out, leaving the final response to be recorded by request()
+        retry = super().increment(method, url, response, error, _pool, _stacktrace)
+        if _pool is not None:
+            if response is not None:
+                ratelimit.get_limiter(_pool.host).record(response.status, response.headers.get('Retry-After'))
+            retry.host = _pool.host
+        return retry
+
+    def sleep(self, response=None) -> None:
+        super().sleep(response)
+        if self.host:
+            ratelimit.get_limiter(self.host).wait()
+
+
+class TimeoutHTTPAdapter(HTTPAdapter):
+    def send(self, request, **kwargs):
+        if kwargs.get('timeout') is None:
+            kwargs['timeout'] = TIMEOUT
+        return super().send(request, **kwargs)
+
+
+def get_session() -> requests.Session:
+    global _session
+
+    with _session_lock:
+        if _session is None:
+            retry = RateLimitedRetry(
+                total=MAX_RETRIES,
+                backoff_factor=BACKOFF_FACTOR,
+                backoff_jitter=BACKOFF_JITTER,
+                status_forcelist=RETRY_STATUSES,
+                respect_retry_after_header=True,
+                raise_on_status=False,
+            )
+            adapter = TimeoutHTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE, max_retries=retry)
+
+            session = requests.Session()
+            session.headers['Accept-Encoding'] = ACCEPT_ENCODING
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session = session
+
+        return _session
+
+
+def get_webhook_session() -> requests.Session:
+    global _webhook_session
+
+    if _webhook_session is None:
+        # the Discord dispatcher requeues failed batches and follows each webhook's rate limit bucket itself,
+        # so nothing below it retries or throttles
+        adapter = TimeoutHTTPAdapter(max_retries=0)
+
+        _webhook_session = requests.Session()
+        _webhook_session.mount("https://", adapter)
+        _webhook_session.mount("http://", adapter)
+
+    return _webhook_session
+
+
+def record_response(url: str, status: int, size: int) -> None:
+    if metrics.is_enabled():
+        host = urlsplit(url).hostname
+        metrics.increment('http_responses', host=host, status=status)
+        metrics.increment('http_bytes', size, host=host)
+
+
+def request(method: str, url: str, **kwargs) -> requests.Response:
+    limiter = ratelimit.get_limiter(urlsplit(url).hostname)
+    limiter.wait()
+
+    response = get_session().request(method, url, **kwargs)
+    limiter.record(response.status_code, response.headers.get('Retry-After'))
+
+    # a streamed body hasn't been read yet, so only its declared length is known
+    size = int(response.headers.get('Content-Length', 0)) if kwargs.get('stream') else len(response.content)
+    record_response(response.url, response.status_code, size)
+    return response
+
+
+def get(url: str, **kwargs) -> requests.Response:
+    return request('GET', url, **kwargs)
+
+
+def post_webhook(url: str, **kwargs) -> requests.Response:
+    response = get_webhook_session().post(url, **kwargs)
+    record_response(response.url, response.status_code, len(response.content))
+    return response
+
+
+def run(coroutine):
+    # a single long-lived loop lets the aiohttp session and its keep-alive connections outlive each batch
+    loop = getattr(_local, 'loop', None)
+
+    if loop is None or loop.is_closed():
+        loop = _local.loop = asyncio.new_event_loop()
+
+    return loop.run_until_complete(coroutine)
+
+
+async def get_async_session() -> aiohttp.ClientSession:
+    session = getattr(_local, 'session', None)
+
+    if session is None or session.closed:
+        connector = aiohttp.TCPConnector(limit=POOL_SIZE, ttl_dns_cache=300)
+        session = _local.session = aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=TIMEOUT))
+
+    return session
+
+
+def get_backoff(attempt: int) -> float:
+    return BACKOFF_FACTOR * (2 ** attempt) + random.uniform(0, BACKOFF_JITTER)
+
+
+async def fetch(url: str, **kwargs) -> tuple:
+    session = await get_async_session()
+    limiter = ratelimit.get_limiter(urlsplit(url).hostname)
+
+    for attempt in range(MAX_RETRIES + 1):
+        delay = limiter.reserve()
+        if delay:
+            await asyncio.sleep(delay)
+
+        try:
+            async with session.get(url, **kwargs) as response:
+                limiter.record(response.status, response.headers.get('Retry-After'))
+                if response.status in RETRY_STATUSES and attempt < MAX_RETRIES:
+                    metrics.increment('http_responses', host=response.url.host, status=response.status)
+                    retry_after = response.headers.get('Retry-After')
+                else:
+                    content = await response.read()
+                    record_response(str(response.url), response.status, len(content))
+                    return str(response.url), response.status, content, response.headers
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            metrics.increment('http_errors', host=urlsplit(url).hostname, error=type(e).__name__)
+            if attempt == MAX_RETRIES:
+                raise
+            retry_after = None
+
+        # the limiter already holds this host back for a Retry-After
+        if not ratelimit.parse_retry_after(retry_after):
+            await asyncio.sleep(get_backoff(attempt))
+
+
+def close_async_session() -> None:
+    # only closes the calling thread's session
+    session = getattr(_local, 'session', None)
+    if session is not None:
+        run(session.close())
+        _local.session = None
+
+
+def close() -> None:
+    global _session, _webhook_session
+
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+            _session = None
+
+    if _webhook_session is not None:
+        _webhook_session.close()
+        _webhook_session = None
+
+    close_async_session()
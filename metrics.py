@@ -0,0 +1,178 @@
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import nullcontext
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+METRICS_PREFIX = "courtyard_scraper"
+
+# instrumentation is a no-op unless a report path or an endpoint port is configured
+_enabled = bool(os.getenv('METRICS_PATH') or os.getenv('METRICS_PORT'))
+_lock = threading.Lock()
+_counters = defaultdict(float)
+_stages = defaultdict(lambda: [0, 0.0])
+_started_at = time.time()
+_null_timer = nullcontext()
+
+
+def enable() -> None:
+    global _enabled
+    _enabled = True
+
+
+def configure() -> None:
+    # picks up settings loaded from .env after import
+    if os.getenv('METRICS_PATH') or os.getenv('METRICS_PORT'):
+        enable()
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def reset() -> None:
+    global _started_at
+
+    with _lock:
+        _counters.clear()
+        _stages.clear()
+        _started_at = time.time()
+
+
+def increment(name: str, value: float = 1, **labels) -> None:
+    if not _enabled:
+        return
+
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        _counters[key] += value
+
+
+def record_time(stage: str, seconds: float) -> None:
+    with _lock:
+        totals = _stages[stage]
+        totals[0] += 1
+        totals[1] += seconds
+
+
+class StageTimer:
+    __slots__ = ('stage', 'start')
+
+    def __init__(self, stage: str):
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        record_time(self.stage, time.perf_counter() - self.start)
+
+
+def timer(stage: str):
+    # concurrent lookups overlap, so a stage's seconds can add up to more than the run's wall time
+    return StageTimer(stage) if _enabled else _null_timer
+
+
+def collect() -> tuple:
+    # the raw counters and stage totals, so a worker process can hand its metrics back to the parent
+    with _lock:
+        return dict(_counters), {stage: tuple(totals) for stage, totals in _stages.items()}
+
+
+def merge(counters: dict, stages: dict) -> None:
+    with _lock:
+        for key, value in counters.items():
+            _counters[key] += value
+        for stage, (count, seconds) in stages.items():
+            totals = _stages[stage]
+            totals[0] += count
+            totals[1] += seconds
+
+
+def report() -> dict:
+    with _lock:
+        stages = {stage: {'count': count, 'seconds': round(seconds, 6)} for stage, (count, seconds) in _stages.items()}
+        counters = defaultdict(list)
+        for (name, labels), value in sorted(_counters.items()):
+            counters[name].append({'labels': dict(labels), 'value': value})
+
+    return {
+        'started_at': _started_at,
+        'duration': round(time.time() - _started_at, 6),
+        'stages': stages,
+        'counters': dict(counters),
+    }
+
+
+def write_report(path: str | None = None) -> None:
+    path = path or os.getenv('METRICS_PATH')
+    if not path:
+        return
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    with open(path, "w") as f:
+        json.dump(report(), f, indent=2)
+
+
+def format_labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"') for value in labels.values())
+    return "{" + ",".join(f'{name}="{value}"' for name, value in zip(labels, escaped)) + "}"
+
+
+def render_prometheus() -> str:
+    run_report = report()
+    lines = [
+        f"# TYPE {METRICS_PREFIX}_uptime_seconds gauge",
+        f"{METRICS_PREFIX}_uptime_seconds {run_report['duration']}",
+        f"# TYPE {METRICS_PREFIX}_stage_calls_total counter",
+    ]
+    for stage, totals in run_report['stages'].items():
+        lines.append(f"{METRICS_PREFIX}_stage_calls_total{format_labels({'stage': stage})} {totals['count']}")
+
+    lines.append(f"# TYPE {METRICS_PREFIX}_stage_seconds_total counter")
+    for stage, totals in run_report['stages'].items():
+        lines.append(f"{METRICS_PREFIX}_stage_seconds_total{format_labels({'stage': stage})} {totals['seconds']}")
+
+    for name, samples in run_report['counters'].items():
+        lines.append(f"# TYPE {METRICS_PREFIX}_{name}_total counter")
+        for sample in samples:
+            lines.append(f"{METRICS_PREFIX}_{name}_total{format_labels(sample['labels'])} {sample['value']:g}")
+
+    return "\n".join(lines) + "\n"
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path != "/metrics":
+            self.send_error(404)
+            return
+
+        body = render_prometheus().encode()
+        self.send_response(200)
+        self.send_header('Content-Type', "text/plain; version=0.0.4")
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(port: int | None = None) -> ThreadingHTTPServer | None:
+    port = port or int(os.getenv('METRICS_PORT', 0))
+    if not port:
+        return
+
+    enable()
+    server = ThreadingHTTPServer(("", port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"Serving metrics on :{port}/metrics")
+    return server
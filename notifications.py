@@ -0,0 +1,233 @@
+import os
+import queue
+import threading
+import time
+
+import numpy as np
+import requests
+
+import http_client
+import metrics
+from alerts import get_alert_key, get_alert_store
+
+DISCORD_API_URL = os.getenv('DISCORD_API_URL', "https://discord.com/api")
+MAX_EMBEDS_PER_MESSAGE = 10
+MAX_SEND_ATTEMPTS = 5
+
+_dispatcher = None
+_dispatcher_lock = threading.Lock()
+
+
+def get_discord_webhook_url(webhook_type=None):
+    if not webhook_type:
+        webhook_id = "DISCORD_WEBHOOK_COURTYARD_ID"
+        webhook_token = "DISCORD_WEBHOOK_COURTYARD_TOKEN"
+    else:
+        webhook_id = "DISCORD_WEBHOOK_OFFERS_ID"
+        webhook_token = "DISCORD_WEBHOOK_OFFERS_TOKEN"
+
+    try:
+        return f"{DISCORD_API_URL}/webhooks/{os.environ[webhook_id]}/{os.environ[webhook_token]}"
+    except KeyError:
+        return f"{DISCORD_API_URL}/webhooks/{os.getenv(webhook_id)}/{os.getenv(webhook_token)}"
+
+
+class DiscordDispatcher:
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._reset_at = {}
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def send(self, webhook_url: str, embed: dict, alert_key: str | None = None) -> None:
+        self._queue.put((webhook_url, embed, alert_key, 0))
+
+    def flush(self, timeout: float = 60) -> None:
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.1)
+
+    def _run(self) -> None:
+        while True:
+            items = [self._queue.get()]
+            while True:
+                try:
+                    items.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            batches = {}
+            for item in items:
+                batches.setdefault(item[0], []).append(item)
+
+            for webhook_url, batch in batches.items():
+                for i in range(0, len(batch), MAX_EMBEDS_PER_MESSAGE):
+                    self._send_batch(webhook_url, batch[i:i + MAX_EMBEDS_PER_MESSAGE])
+
+            for _ in items:
+                self._queue.task_done()
+
+    def _send_batch(self, webhook_url: str, batch: list) -> None:
+        # each webhook is its own rate limit bucket
+        delay = self._reset_at.get(webhook_url, 0) - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+        try:
+            with metrics.timer('discord_post'):
+                response = http_client.post_webhook(webhook_url, json={"embeds": [embed for _, embed, _, _ in batch]})
+        except requests.RequestException as e:
+            print(f"Failed to send to Discord: {e!r}")
+            response = None
+
+        if response is not None:
+            if response.headers.get('X-RateLimit-Remaining') == '0':
+                reset_after = float(response.headers.get('X-RateLimit-Reset-After', 0))
+                self._reset_at[webhook_url] = time.monotonic() + reset_after
+
+            if response.status_code == 429:
+                retry_after = float(response.headers.get('Retry-After', 1))
+                self._reset_at[webhook_url] = time.monotonic() + retry_after
+            elif response.status_code < 400:
+                metrics.increment('alerts_sent', len(batch))
+                for _, _, alert_key, _ in batch:
+                    if alert_key:
+                        get_alert_store().confirm(alert_key)
+                return
+            else:
+                print(response.content)
+                if response.status_code < 500:
+                    # a rejected payload or a bad webhook fails the same way every time
+                    for _, embed, alert_key, _ in batch:
+                        self._drop(embed, alert_key, f"Discord rejected it with {response.status_code}")
+                    return
+
+        # back off before the retry instead of burning every attempt at once
+        attempts = max(attempts for _, _, _, attempts in batch)
+        self._reset_at[webhook_url] = max(
+            self._reset_at.get(webhook_url, 0), time.monotonic() + http_client.get_backoff(attempts)
+        )
+
+        for webhook_url, embed, alert_key, attempts in batch:
+            if attempts + 1 < MAX_SEND_ATTEMPTS:
+                self._queue.put((webhook_url, embed, alert_key, attempts + 1))
+            else:
+                self._drop(embed, alert_key, f"{MAX_SEND_ATTEMPTS} attempts")
+
+    @staticmethod
+    def _drop(embed: dict, alert_key: str | None, reason: str) -> None:
+        metrics.increment('alerts_dropped')
+        if alert_key:
+            get_alert_store().release(alert_key)
+        print(f"Dropping Discord alert after {reason}: {embed.get('title')}")
+
+
+def get_dispatcher() -> DiscordDispatcher:
+    global _dispatcher
+
+    with _dispatcher_lock:
+        if _dispatcher is None:
+            _dispatcher = DiscordDispatcher()
+
+    return _dispatcher
+
+
+def flush(timeout: float = 60) -> None:
+    if _dispatcher is not None:
+        _dispatcher.flush(timeout)
+
+
+def send_results_to_discord(card_name, card_img, courtyard_price, pricecharting_price, pricecharting_url,
+                            courtyard_url, volume):
+    proof_of_integrity = courtyard_url.rsplit('/', 1)[-1]
+    # the key is only stored once Discord accepts the alert, so a failed delivery isn't suppressed next run
+    alert_key = get_alert_key(proof_of_integrity, 'price', courtyard_price)
+    if not get_alert_store().reserve(alert_key):
+        metrics.increment('alerts_suppressed', type='price')
+        return
+    metrics.increment('alerts_queued', type='price')
+
+    DISCORD_WEBHOOK_URL = get_discord_webhook_url()
+
+    price_difference = round(((1 - (pricecharting_price / courtyard_price)) * 100), 2)
+
+    embed = {
+        "title": card_name,
+        'description': f"Volume: {volume}",
+        "image": {
+            "url": card_img
+        },
+        "fields": [
+            {
+                "name": "courtyard.io",
+                "value": f"${courtyard_price}\n{courtyard_url}"
+            },
+            {
+                "name": "pricecharting.com",
+                "value": f"${pricecharting_price}\n{pricecharting_url}"
+            }
+        ],
+        "footer": {
+            "text": f"Price difference of {price_difference}%"
+        }
+    }
+
+    get_dispatcher().send(DISCORD_WEBHOOK_URL, embed, alert_key)
+
+
+def send_courtyard_offer_to_discord(offer_price, listing_price, asset):
+    alert_key = get_alert_key(asset['proof_of_integrity'], 'offer', f"{listing_price}/{offer_price}")
+    if not get_alert_store().reserve(alert_key):
+        metrics.increment('alerts_suppressed', type='offer')
+        return
+    metrics.increment('alerts_queued', type='offer')
+
+    DISCORD_WEBHOOK_URL = get_discord_webhook_url("offers")
+
+    price_difference = round(((1 - (offer_price / listing_price)) * 100), 2)
+
+    card_name = asset['title']
+    card_img = asset['image']
+    courtyard_url = f"https://courtyard.io/asset/{asset['proof_of_integrity']}"
+
+    embed = {
+        "title": card_name,
+        'url': courtyard_url,
+        "image": {
+            "url": card_img
+        },
+        "fields": [
+            {
+                "name": "Listing Price",
+                "value": f"${listing_price}"
+            },
+            {
+                "name": "Top Offer",
+                "value": f"${offer_price}"
+            }
+        ],
+        "footer": {
+            "text": f"Price difference of {price_difference}%"
+        }
+    }
+
+    get_dispatcher().send(DISCORD_WEBHOOK_URL, embed, alert_key)
+
+
+def send_offer_alerts(assets, records, evaluation):
+    # `evaluation` is evaluation.evaluate_page's result for the same page of records
+    for i in np.flatnonzero(evaluation['offer']):
+        send_courtyard_offer_to_discord(records[i].best_offer, records[i].price, assets[i])
+
+
+def send_deal_alerts(records, lookups, evaluation):
+    for i in np.flatnonzero(evaluation['deal']):
+        send_results_to_discord(
+            card_name=records[i].name,
+            card_img=lookups[i]['card_img'],
+            pricecharting_price=float(evaluation['reference_price'][i]),
+            courtyard_price=records[i].price,
+            pricecharting_url=lookups[i]['pricecharting_url'],
+            courtyard_url=records[i].courtyard_url,
+            volume=evaluation['volume'][i]
+        )
@@ -0,0 +1,44 @@
+import threading
+import time
+from itertools import islice
+
+import requests
+
+import metrics
+from courtyard import iter_courtyard_assets_streaming
+from evaluation import get_best_offer, get_listing_price, is_offer_arbitrage
+from notifications import send_courtyard_offer_to_discord
+
+OFFER_SCAN_ASSETS = 500  # newest listings rechecked per query on every pass
+OFFER_POLL_INTERVAL = 10  # seconds between the starts of two passes
+
+
+def scan_offers(urls, max_assets=OFFER_SCAN_ASSETS):
+    # offers land on listings of any age, so every pass rechecks the newest listings instead of
+    # stopping at a watermark; the alert store drops the ones already sent
+    found = 0
+
+    for url in urls:
+        for asset in islice(iter_courtyard_assets_streaming(url), max_assets):
+            metrics.increment('offers_scanned')
+            listing_price = get_listing_price(asset)
+            best_offer = get_best_offer(asset)
+
+            if is_offer_arbitrage(listing_price, best_offer):
+                found += 1
+                send_courtyard_offer_to_discord(best_offer, listing_price, asset)
+
+    return found
+
+
+def monitor_offers(urls, stop: threading.Event, interval=OFFER_POLL_INTERVAL):
+    while not stop.is_set():
+        started = time.monotonic()
+
+        try:
+            with metrics.timer('offer_scan'):
+                scan_offers(urls)
+        except (requests.RequestException, KeyError, IndexError, ValueError) as e:
+            print(f"Offer scan failed: {e!r}")
+
+        stop.wait(max(interval - (time.monotonic() - started), 0))
@@ -0,0 +1,329 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from enum import Enum
+
+import aiohttp
+import lxml.etree
+import lxml.html
+
+import http_client
+import metrics
+from catalog import ProductCatalog, get_catalog, tokenize
+from records import format_card_key
+
+
+class ResultTable(Enum):
+    IMAGE = 0
+    TITLE = 1
+    SET = 2
+
+
+PRICECHARTING_URL = os.getenv('PRICECHARTING_URL', "https://www.pricecharting.com")
+MAX_CONCURRENT_LOOKUPS = 10
+# pages are parsed in worker processes while the event loop keeps fetching, one core is left to the loop; 0 parses inline
+DEFAULT_PARSE_WORKERS = max((os.cpu_count() or 1) - 1, 0)
+
+_parse_pool = None
+_parse_pool_lock = threading.Lock()
+
+headers = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/126.0.0.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7',
+    'Accept-Language': 'en-GB,en-US;q=0.9,en;q=0.8,zh-TW;q=0.7,zh-CN;q=0.6,zh;q=0.5',
+}
+
+
+def get_parse_pool() -> ProcessPoolExecutor | None:
+    global _parse_pool
+
+    with _parse_pool_lock:
+        workers = int(os.getenv('PARSE_WORKERS', DEFAULT_PARSE_WORKERS))
+        if _parse_pool is None and workers > 0:
+            # spawned rather than forked, since the parent already runs the refresher thread
+            _parse_pool = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('spawn'))
+        return _parse_pool
+
+
+def close_parse_pool() -> None:
+    global _parse_pool
+
+    with _parse_pool_lock:
+        if _parse_pool is not None:
+            _parse_pool.shutdown()
+            _parse_pool = None
+
+
+def run_in_worker(parser, *args) -> tuple:
+    # a pool worker times each page's stages afresh and hands them back with the result
+    metrics.enable()
+    metrics.reset()
+    return parser(*args), metrics.collect()
+
+
+async def parse_page(parser, *args):
+    # only the response bytes go out to the pool and plain lists and dicts come back
+    pool = get_parse_pool()
+    if pool is None:
+        return parser(*args)
+
+    with metrics.timer('parse_pool'):
+        result, worker_metrics = await asyncio.get_running_loop().run_in_executor(pool, run_in_worker, parser, *args)
+    if metrics.is_enabled():
+        metrics.merge(*worker_metrics)
+    return result
+
+
+def get_search_url(params: str) -> str:
+    return f"{PRICECHARTING_URL}/search-products?q={params}&type=prices"
+
+
+def parse_html(content: bytes) -> lxml.html.HtmlElement:
+    return lxml.html.fromstring(content)
+
+
+def extract_prices_from_html(tree: lxml.html.HtmlElement) -> dict:
+    elements = tree.xpath('(//div[@id="full-prices"])[1]//tr')
+    card_information = {'prices': {}}
+
+    for ele in elements:
+        cell = ele.xpath('.//td')
+        if not cell:
+            continue
+        grade = cell[0].text_content()
+        try:
+            price = float(cell[1].text_content().replace("$", ""))
+        except ValueError:
+            price = None
+        card_information['prices'][grade] = price
+
+    return card_information
+
+
+def get_prices_from_pricecharting(tree: lxml.html.HtmlElement) -> dict:
+    return extract_prices_from_html(tree)
+
+
+def get_liquidity_from_pricecharting(tree: lxml.html.HtmlElement) -> list:
+    sales_volume = tree.xpath('//tr[contains(concat(" ", normalize-space(@class), " "), " sales_volume ")]')[0]
+    return [a.text_content() for a in sales_volume.xpath('.//a')]
+
+
+def get_image_from_pricecharting(tree: lxml.html.HtmlElement) -> str:
+    return tree.xpath('(//div[@id="product_details"])[1]//img/@src')[0]
+
+
+def get_search_result_rows(search_result_tree: lxml.html.HtmlElement) -> list:
+    result = search_result_tree.xpath('//table[@id="games_table"]')
+    if not result:
+        return []
+
+    rows = []
+
+    for row in result[0].xpath('(.//tbody)[1]//tr[starts-with(@id, "product-")]'):
+        results = row.xpath('.//td')
+        card_url = results[ResultTable.IMAGE.value].xpath('.//a/@href')[0].strip()
+        title = results[ResultTable.TITLE.value].xpath('.//a')[0].text_content().strip()
+        card_set = results[ResultTable.SET.value].text_content().strip()
+        rows.append((card_url, title, card_set))
+
+    return rows
+
+
+def matches_attributes(title: str, card_set: str, attributes: dict) -> bool:
+    return not (attributes['Title'].lower() not in title.lower() or
+                ('Card Number' in attributes and attributes['Card Number'] not in title) or
+                (attributes['Language'] == 'Japanese' and 'Japanese' not in card_set) or
+                (attributes['Language'] == 'English' and 'Japanese' in card_set) or
+                ('Promo' in attributes['Set'] and 'Promo' not in card_set) or
+                (attributes['1st Edition'] and '1st Edition' not in title) or
+                (not attributes['1st Edition'] and '1st Edition' in title))
+
+
+def select_product_url(rows: list, attributes: dict) -> str | None:
+    res = []
+
+    for card_url, title, card_set in rows:
+        if not matches_attributes(title, card_set, attributes):
+            continue
+
+        if attributes['Set'].lower() in card_set.lower():
+            res = [card_url]
+            break
+
+        res.append(card_url)
+
+    if len(res) == 1 and '/game/' in res[0]:
+        return res[0]
+
+
+def parse_search_results(content: bytes) -> list:
+    return get_search_result_rows(parse_html(content))
+
+
+def get_product_url_from_results(search_result_tree: lxml.html.HtmlElement, attributes: dict) -> str | None:
+    return select_product_url(get_search_result_rows(search_result_tree), attributes)
+
+
+def create_name_param_for_pricecharting_search(attributes: dict) -> str:
+    if 'Card Number' in attributes:
+        with_spaces = f"{attributes['Title']} {attributes['Card Number']}"
+    else:
+        with_spaces = attributes['Title']
+    return with_spaces.replace(" ", "+")
+
+
+def get_card_key(attributes: dict) -> str:
+    # a CardRecord's Card Number is already parsed for searching, so it carries the key built from the raw value
+    card_key = getattr(attributes, 'card_key', None)
+    if card_key:
+        return card_key
+    return format_card_key(attributes.get('Title', ''), attributes.get('Card Number', ''), attributes.get('Set', ''),
+                           attributes.get('Language', ''), bool(attributes.get('1st Edition')))
+
+
+def get_search_tokens(attributes: dict) -> list:
+    return tokenize(f"{attributes['Title']} {attributes.get('Card Number', '')}")
+
+
+def find_product_url_in_catalog(catalog: ProductCatalog, attributes: dict) -> str | None:
+    pricecharting_url = catalog.get_resolved(get_card_key(attributes))
+    if pricecharting_url:
+        return pricecharting_url
+
+    # only trust a catalog hit that also matches the set, since the catalog may not hold every candidate
+    matches = [card_url for card_url, title, card_set in catalog.find_products(get_search_tokens(attributes))
+               if matches_attributes(title, card_set, attributes) and attributes['Set'].lower() in card_set.lower()]
+    if len(matches) == 1 and '/game/' in matches[0]:
+        return matches[0]
+
+
+def get_validators(response_headers) -> dict:
+    # aiohttp's header mapping doesn't pickle, and these are the only headers kept
+    return {'ETag': response_headers.get('ETag'), 'Last-Modified': response_headers.get('Last-Modified')}
+
+
+def extract_pricecharting_information(pricecharting_url: str, content: bytes, response_headers=None) -> dict:
+    with metrics.timer('pricecharting_parse'):
+        tree = parse_html(content)
+
+    with metrics.timer('price_extraction'):
+        pricecharting_information = get_prices_from_pricecharting(tree)
+        pricecharting_information['pricecharting_url'] = pricecharting_url
+        pricecharting_information['card_img'] = get_image_from_pricecharting(tree)
+        pricecharting_information['liquidity_info'] = get_liquidity_from_pricecharting(tree)
+        pricecharting_information['fetched_at'] = time.time()
+
+    if response_headers is not None:
+        pricecharting_information['etag'] = response_headers.get('ETag')
+        pricecharting_information['last_modified'] = response_headers.get('Last-Modified')
+
+    return pricecharting_information
+
+
+async def fetch_page_from_pricecharting(attributes: dict, catalog: ProductCatalog) -> tuple | None:
+    card_key = get_card_key(attributes)
+
+    with metrics.timer('pricecharting_resolve'):
+        pricecharting_url = find_product_url_in_catalog(catalog, attributes)
+    if pricecharting_url:
+        metrics.increment('catalog_lookups', result='hit')
+        with metrics.timer('pricecharting_product'):
+            pricecharting_url, status, content, response_headers = await http_client.fetch(pricecharting_url, headers=headers)
+        if status == 200 and '/game/' in pricecharting_url:
+            return pricecharting_url, content, response_headers
+    else:
+        metrics.increment('catalog_lookups', result='miss')
+
+    params = create_name_param_for_pricecharting_search(attributes)
+
+    with metrics.timer('pricecharting_search'):
+        pricecharting_url, status, content, response_headers = await http_client.fetch(get_search_url(params), headers=headers)
+
+    if status == 200 and '/game/' not in pricecharting_url:
+        rows = await parse_page(parse_search_results, content)
+        with metrics.timer('pricecharting_resolve'):
+            catalog.add_products(rows)
+            pricecharting_url = select_product_url(rows, attributes)
+        if not pricecharting_url:
+            metrics.increment('lookups', result='unmatched')
+            return
+
+        with metrics.timer('pricecharting_product'):
+            pricecharting_url, status, content, response_headers = await http_client.fetch(pricecharting_url, headers=headers)
+
+    if status != 200:
+        return
+
+    catalog.set_resolved(card_key, pricecharting_url)
+    return pricecharting_url, content, response_headers
+
+
+async def lookup_card(semaphore: asyncio.Semaphore, attributes: dict, catalog: ProductCatalog) -> dict | None:
+    try:
+        async with semaphore:
+            page = await fetch_page_from_pricecharting(attributes, catalog)
+        if not page:
+            return
+
+        pricecharting_url, content, response_headers = page
+        return await parse_page(extract_pricecharting_information, pricecharting_url, content,
+                                get_validators(response_headers))
+    except (aiohttp.ClientError, asyncio.TimeoutError, IndexError, lxml.etree.LxmlError) as e:
+        metrics.increment('lookups', result='failed')
+        print(f"Failed to look up {attributes.get('Title')} on pricecharting.com: {e!r}")
+
+
+async def revalidate_card(semaphore: asyncio.Semaphore, pricecharting_information: dict) -> tuple:
+    request_headers = dict(headers)
+    if pricecharting_information.get('etag'):
+        request_headers['If-None-Match'] = pricecharting_information['etag']
+    if pricecharting_information.get('last_modified'):
+        request_headers['If-Modified-Since'] = pricecharting_information['last_modified']
+
+    try:
+        async with semaphore:
+            with metrics.timer('pricecharting_revalidate'):
+                pricecharting_url, status, content, response_headers = await http_client.fetch(
+                    pricecharting_information['pricecharting_url'], headers=request_headers
+                )
+
+        if status == 304:
+            return dict(pricecharting_information, fetched_at=time.time()), True
+        if status == 200:
+            return await parse_page(extract_pricecharting_information, pricecharting_url, content,
+                                    get_validators(response_headers)), False
+    except (aiohttp.ClientError, asyncio.TimeoutError, IndexError, lxml.etree.LxmlError) as e:
+        print(f"Failed to refresh {pricecharting_information['pricecharting_url']}: {e!r}")
+
+    return None, False
+
+
+async def revalidate_cards(entries: list, concurrency: int = MAX_CONCURRENT_LOOKUPS) -> list:
+    semaphore = asyncio.Semaphore(concurrency)
+    return await asyncio.gather(*(revalidate_card(semaphore, entry) for entry in entries))
+
+
+def revalidate_pricecharting_information(entries: list, concurrency: int = MAX_CONCURRENT_LOOKUPS) -> list:
+    if not entries:
+        return []
+    return http_client.run(revalidate_cards(entries, concurrency))
+
+
+async def lookup_cards(attributes_list: list, concurrency: int = MAX_CONCURRENT_LOOKUPS,
+                       catalog: ProductCatalog | None = None) -> list:
+    if catalog is None:
+        catalog = get_catalog()
+
+    semaphore = asyncio.Semaphore(concurrency)
+    return await asyncio.gather(*(lookup_card(semaphore, attributes, catalog) for attributes in attributes_list))
+
+
+def get_pricecharting_information(attributes_list: list, concurrency: int = MAX_CONCURRENT_LOOKUPS,
+                                 catalog: ProductCatalog | None = None) -> list:
+    if not attributes_list:
+        return []
+    return http_client.run(lookup_cards(attributes_list, concurrency, catalog))
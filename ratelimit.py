@@ -0,0 +1,123 @@
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+import metrics
+
+DEFAULT_RATE = 5.0  # requests per second
+MIN_RATE = 0.2
+MAX_RATE = 50.0
+BURST = 5
+ADDITIVE_INCREASE = 1.0  # requests per second gained per second of unthrottled traffic
+MULTIPLICATIVE_DECREASE = 0.5
+THROTTLE_STATUSES = frozenset({429, 503})
+
+# (starting rate, ceiling) for hosts that warrant a gentler start than the default
+HOST_LIMITS = {
+    'www.pricecharting.com': (2.0, 10.0),
+}
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def parse_retry_after(retry_after: str | None) -> float | None:
+    if not retry_after:
+        return
+    try:
+        return max(float(retry_after), 0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(retry_after).timestamp() - time.time(), 0)
+    except (TypeError, ValueError):
+        return
+
+
+class RateLimiter:
+    # A token bucket whose rate adapts AIMD-style: it grows while the host keeps answering
+    # and halves on 429/503, pausing for Retry-After when the host names a time.
+    def __init__(self, host: str, rate: float = DEFAULT_RATE, max_rate: float = MAX_RATE, min_rate: float = MIN_RATE,
+                 burst: int = BURST):
+        self.host = host
+        self.rate = rate
+        self.max_rate = max_rate
+        self.min_rate = min_rate
+        self.burst = burst
+        self.requests = 0
+        self.throttled = 0
+
+        # like TCP slow start, the rate climbs quickly until the host first pushes back
+        self._slow_start = True
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._first_request = None
+        self._last_request = None
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        # claims the next token and returns how long the caller has to wait before using it
+        with self._lock:
+            now = time.monotonic()
+            if now > self._updated:
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+
+            self._tokens -= 1
+            start = self._updated + max(-self._tokens, 0) / self.rate
+
+            self.requests += 1
+            if self._first_request is None:
+                self._first_request = start
+            self._last_request = max(start, self._last_request or start)
+
+        delay = max(start - now, 0)
+        if delay:
+            metrics.increment('rate_limit_wait_seconds', delay, host=self.host)
+        return delay
+
+    def wait(self) -> None:
+        delay = self.reserve()
+        if delay:
+            time.sleep(delay)
+
+    def record(self, status: int, retry_after: str | None = None) -> None:
+        with self._lock:
+            if status in THROTTLE_STATUSES:
+                self.throttled += 1
+                self._slow_start = False
+                self.rate = max(self.min_rate, self.rate * MULTIPLICATIVE_DECREASE)
+
+                pause = parse_retry_after(retry_after)
+                if pause:
+                    # nothing else goes out to this host until the server said it would be ready
+                    self._updated = max(self._updated, time.monotonic() + pause)
+                    self._tokens = min(self._tokens, 0)
+            elif status < 400:
+                self.rate = min(self.max_rate, self.rate + (1 if self._slow_start else ADDITIVE_INCREASE / self.rate))
+
+        if status in THROTTLE_STATUSES:
+            metrics.increment('http_throttled', host=self.host, status=status)
+
+    def effective_rate(self) -> float:
+        if not self._first_request or self._last_request <= self._first_request:
+            return 0
+        return (self.requests - 1) / (self._last_request - self._first_request)
+
+    def report(self) -> str:
+        return (f"{self.host}: {self.rate:.1f}/s allowed, {self.effective_rate():.1f}/s achieved over "
+                f"{self.requests} requests, {self.throttled} throttled")
+
+
+def get_limiter(host: str) -> RateLimiter:
+    with _limiters_lock:
+        if host not in _limiters:
+            rate, max_rate = HOST_LIMITS.get(host, (DEFAULT_RATE, MAX_RATE))
+            _limiters[host] = RateLimiter(host, rate, max_rate)
+        return _limiters[host]
+
+
+def report() -> str:
+    with _limiters_lock:
+        limiters = list(_limiters.values())
+    return "; ".join(limiter.report() for limiter in limiters)
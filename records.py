@@ -0,0 +1,112 @@
+import re
+from functools import lru_cache
+
+from evaluation import get_best_offer, get_listing_price, parse_grade
+
+ATTRIBUTE_FIELDS = {
+    'Card Number': 'card_number',
+    'Set': 'card_set',
+    'Language': 'language',
+    'Grader': 'grader',
+    'Grade': 'grade',
+    'Serial': 'serial',
+    'Category': 'category',
+    'Year': 'year',
+}
+# the attribute names the PriceCharting lookup reads with dict-style access
+KEYS = {'Title': 'title', '1st Edition': 'first_edition', **ATTRIBUTE_FIELDS}
+
+# attribute name -> record field, filled in as names are first seen; '' marks attributes that aren't kept
+_fields = {"": 'first_edition'}
+
+
+def get_field(name: str) -> str:
+    # titles come under a few different attribute names, so each distinct name is only matched once
+    field = _fields[name] = 'title' if 'Title' in name else ATTRIBUTE_FIELDS.get(name, '')
+    return field
+
+
+def normalize_card_field(value) -> str:
+    return " ".join(str(value).lower().split())
+
+
+def normalize_card_number(card_number) -> str:
+    # "025/165" -> "25/165", "SWSH050" -> "swsh50": zero padding never tells two cards apart
+    return re.sub(r"(?<!\d)0+(?=\d)", "", normalize_card_field(card_number))
+
+
+@lru_cache(maxsize=65536)
+def format_card_key(title: str, card_number: str, card_set: str, language: str, first_edition: bool) -> str:
+    # card_number is the raw Courtyard attribute, so both drivers build the same key whatever parsing they search with
+    return "card:" + "|".join([
+        normalize_card_field(title),
+        normalize_card_number(card_number),
+        normalize_card_field(card_set),
+        normalize_card_field(language),
+        '1st' if first_edition else '',
+    ])
+
+
+def strip_leading_zeros(card_number: str) -> str:
+    return card_number.lstrip("0")
+
+
+class CardRecord:
+    __slots__ = ('title', 'card_number', 'card_set', 'language', 'first_edition', 'grader', 'grade', 'grade_number',
+                 'grade_label', 'serial', 'category', 'year', 'price', 'best_offer', 'card_key', 'proof_of_integrity',
+                 'name')
+
+    def __init__(self, asset: dict, parse_card_number=strip_leading_zeros):
+        self.title = self.card_number = self.card_set = self.language = None
+        self.grader = self.grade = self.serial = self.category = self.year = None
+        self.first_edition = False
+
+        for attribute in asset['attributes']:
+            name = attribute['name']
+            field = _fields.get(name)
+            if field is None:
+                field = get_field(name)
+
+            if field == 'first_edition':
+                if attribute['value'] == '1st Edition':
+                    self.first_edition = True
+            elif field:
+                setattr(self, field, attribute['value'])
+
+        card_number = self.card_number
+        if card_number is not None:
+            self.card_number = parse_card_number(card_number)
+
+        # the label keeps PriceCharting's spelling of the grade ("10", "9.5") for the grading columns
+        self.grade_label = parse_grade(self.grade) if self.grade else ""
+        self.grade_number = float(self.grade_label) if self.grade_label else None
+        self.price = get_listing_price(asset)
+        self.best_offer = get_best_offer(asset)
+        self.proof_of_integrity = asset['proof_of_integrity']
+        self.name = asset['title']
+        self.card_key = format_card_key(self.title or '', card_number or '', self.card_set or '',
+                                        self.language or '', self.first_edition)
+
+    @property
+    def grading(self) -> str:
+        return f"{self.grader} {self.grade_label}"
+
+    @property
+    def courtyard_url(self) -> str:
+        return f"https://courtyard.io/asset/{self.proof_of_integrity}"
+
+    # read-only mapping access under the Courtyard attribute names; missing attributes raise KeyError like a dict
+    def __getitem__(self, key: str):
+        value = getattr(self, KEYS[key])
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key: str) -> bool:
+        return key in KEYS and getattr(self, KEYS[key]) is not None
+
+    def get(self, key: str, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
@@ -1,14 +1,69 @@
 import redis
+import redis.asyncio
+
+
+def unwrap_json_result(result):
+    # JSON.GET/JSON.MGET with a "$" path wrap each value in a list of matches
+    if isinstance(result, list):
+        return result[0] if result else None
+    return result
 
 
 class RedisCache:
-    def __init__(self, host='localhost', port=6379):
-        self._redis_client = redis.Redis(host=host, port=port)
-        self.expiration_time = 259200  # 3 days in seconds
+    def __init__(self, host='localhost', port=6379, client=None, expiration_time=259200):
+        self._redis_client = client or redis.Redis(host=host, port=port)
+        self.expiration_time = expiration_time
 
     def get(self, key: str):
-        return self._redis_client.json().get(key, "$")
+        return unwrap_json_result(self._redis_client.json().get(key, "$"))
 
     def set(self, key: str, val: dict) -> None:
-        self._redis_client.json().set(key, "$", val)
-        self._redis_client.expire(key, self.expiration_time)
+        self.set_many({key: val})
+
+    def get_many(self, keys: list) -> list:
+        if not keys:
+            return []
+        results = self._redis_client.json().mget(keys, "$")
+        return [unwrap_json_result(result) for result in results]
+
+    def set_many(self, items: dict) -> None:
+        if not items:
+            return
+        pipeline = self._redis_client.pipeline(transaction=False)
+        for key, val in items.items():
+            pipeline.json().set(key, "$", val)
+            pipeline.expire(key, self.expiration_time)
+        pipeline.execute()
+
+
+class AsyncRedisCache:
+    def __init__(self, host='localhost', port=6379, max_connections=10, client=None, expiration_time=259200):
+        if client is None:
+            pool = redis.asyncio.ConnectionPool(host=host, port=port, max_connections=max_connections)
+            client = redis.asyncio.Redis(connection_pool=pool)
+        self._redis_client = client
+        self.expiration_time = expiration_time
+
+    async def get(self, key: str):
+        return unwrap_json_result(await self._redis_client.json().get(key, "$"))
+
+    async def set(self, key: str, val: dict) -> None:
+        await self.set_many({key: val})
+
+    async def get_many(self, keys: list) -> list:
+        if not keys:
+            return []
+        results = await self._redis_client.json().mget(keys, "$")
+        return [unwrap_json_result(result) for result in results]
+
+    async def set_many(self, items: dict) -> None:
+        if not items:
+            return
+        pipeline = self._redis_client.pipeline(transaction=False)
+        for key, val in items.items():
+            pipeline.json().set(key, "$", val)
+            pipeline.expire(key, self.expiration_time)
+        await pipeline.execute()
+
+    async def close(self) -> None:
+        await self._redis_client.aclose()
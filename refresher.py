@@ -0,0 +1,106 @@
+import queue
+import threading
+
+import http_client
+from cache import TieredCache
+from history import get_price_history
+from pricecharting import revalidate_pricecharting_information
+from resolver import get_age
+
+WARM_AFTER = 172800  # 2 days in seconds, so popular cards are refreshed a day before they go stale
+WARM_LIMIT = 200  # most-listed cards kept warm
+POPULARITY_DAYS = 7
+
+
+class CacheRefresher:
+    # Revalidates cache entries on a background thread while lookups keep serving the stale copy.
+    # The worker only talks to PriceCharting: results are written back on the calling thread,
+    # which owns the SQLite connections of the cache and the price history.
+    def __init__(self, card_cache: TieredCache):
+        self.card_cache = card_cache
+        self.refreshed = 0
+        self.failed = 0
+
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._results = queue.Queue()
+        self._thread = threading.Thread(target=self._work, name="cache-refresher", daemon=True)
+        self._thread.start()
+
+    def submit(self, entries: dict) -> int:
+        # entries map card keys to their cached pricecharting information; keys already queued are skipped
+        with self._lock:
+            entries = {card_key: entry for card_key, entry in entries.items() if card_key not in self._pending}
+            self._pending.update(entries)
+
+        for item in entries.items():
+            self._queue.put(item)
+        return len(entries)
+
+    def warm(self, limit: int = WARM_LIMIT, days: float = POPULARITY_DAYS) -> int:
+        card_keys = get_price_history().popular_cards(days, limit)
+        # read from the backing tier so warming neither churns the memory tier nor counts as cache traffic
+        entries = self.card_cache.tiers[-1].get_many(card_keys)
+        return self.submit({card_key: entry for card_key, entry in zip(card_keys, entries)
+                            if entry and get_age(entry) > WARM_AFTER})
+
+    def _work(self) -> None:
+        stopping = False
+        try:
+            while not stopping:
+                # whatever was queued in the meantime is revalidated together
+                batch = [self._queue.get()]
+                while True:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+
+                stopping = None in batch
+                batch = [item for item in batch if item is not None]
+                results = revalidate_pricecharting_information([entry for _, entry in batch])
+                for (card_key, _), (pricecharting_information, not_modified) in zip(batch, results):
+                    self._results.put((card_key, pricecharting_information, not_modified))
+        finally:
+            http_client.close_async_session()
+
+    def apply(self) -> int:
+        updates = {}
+
+        while True:
+            try:
+                card_key, pricecharting_information, not_modified = self._results.get_nowait()
+            except queue.Empty:
+                break
+
+            with self._lock:
+                self._pending.discard(card_key)
+
+            # a failed refresh leaves the stale entry in place until the card is seen again
+            if pricecharting_information:
+                self.card_cache.record_revalidation(not_modified)
+                updates[card_key] = pricecharting_information
+            else:
+                self.failed += 1
+
+        self.card_cache.set_many(updates)
+        get_price_history().record_pricecharting(updates)
+        self.refreshed += len(updates)
+        return len(updates)
+
+    def close(self) -> None:
+        # waits for the queued refreshes so they are written back before the run ends
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+        self.apply()
+
+    def report(self) -> str:
+        return f"{self.refreshed} refreshed in the background, {self.failed} failed"
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
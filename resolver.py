@@ -0,0 +1,70 @@
+import time
+
+from cache import TieredCache
+from history import get_price_history
+from pricecharting import get_pricecharting_information, revalidate_pricecharting_information
+
+REVALIDATE_AFTER = 259200  # 3 days in seconds
+MAX_STALENESS = 604800  # 7 days in seconds; older entries are revalidated before they are used
+
+
+def get_age(pricecharting_information: dict) -> float:
+    return time.time() - pricecharting_information.get('fetched_at', 0)
+
+
+def is_stale(pricecharting_information: dict) -> bool:
+    return get_age(pricecharting_information) > REVALIDATE_AFTER
+
+
+def check_cache(card_keys: list, card_cache: TieredCache, serials: dict | None = None) -> dict:
+    cached = dict(zip(card_keys, card_cache.get_many(card_keys)))
+
+    if serials:
+        # entries written before card keys were introduced are stored under the slab's serial
+        legacy = [(card_key, serial) for card_key, serial in serials.items() if not cached[card_key]]
+        migrated = {}
+        for (card_key, _), cache in zip(legacy, card_cache.get_many([serial for _, serial in legacy])):
+            if cache:
+                cached[card_key] = cache
+                migrated[card_key] = cache
+        card_cache.set_many(migrated)
+
+    return cached
+
+
+def resolve_cards(records: list, card_cache: TieredCache, migrate_serial_keys: bool = False, refresher=None) -> list:
+    if refresher is not None:
+        refresher.apply()
+
+    card_keys = [record.card_key for record in records]
+    unique = dict(zip(card_keys, records))
+    serials = {card_key: record.serial for card_key, record in unique.items()} if migrate_serial_keys else None
+
+    cached = check_cache(list(unique), card_cache, serials)
+
+    stale = {card_key: cache for card_key, cache in cached.items() if cache and is_stale(cache)}
+    misses = {card_key: unique[card_key] for card_key, cache in cached.items() if not cache}
+
+    if refresher is not None:
+        # stale entries are served as they are and refreshed in the background, unless they are too old to trust
+        refresher.submit({card_key: cache for card_key, cache in stale.items() if get_age(cache) <= MAX_STALENESS})
+        stale = {card_key: cache for card_key, cache in stale.items() if get_age(cache) > MAX_STALENESS}
+
+    updates = {}
+
+    for card_key, (pricecharting_information, not_modified) in zip(
+            stale, revalidate_pricecharting_information(list(stale.values()))):
+        # a failed refresh keeps serving the stale entry
+        if pricecharting_information:
+            card_cache.record_revalidation(not_modified)
+            updates[card_key] = pricecharting_information
+
+    for card_key, pricecharting_information in zip(misses, get_pricecharting_information(list(misses.values()))):
+        if pricecharting_information:
+            updates[card_key] = pricecharting_information
+
+    card_cache.set_many(updates)
+    get_price_history().record_pricecharting(updates)
+    cached.update(updates)
+
+    return [cached[card_key] for card_key in card_keys]
@@ -0,0 +1,100 @@
+import os
+from datetime import datetime, timezone
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+DEFAULT_SNAPSHOT_PATH = os.path.join(".cache", "snapshots")
+SNAPSHOT_COMPRESSION = "zstd"
+
+SNAPSHOT_SCHEMA = pa.schema([
+    ('captured_at', pa.timestamp('s', tz='UTC')),
+    ('serial', pa.string()),
+    ('proof_of_integrity', pa.string()),
+    ('title', pa.string()),
+    ('card_title', pa.string()),
+    ('card_number', pa.string()),
+    ('set', pa.string()),
+    ('language', pa.string()),
+    ('first_edition', pa.bool_()),
+    ('grader', pa.string()),
+    ('grade', pa.string()),
+    ('grade_number', pa.float64()),
+    ('courtyard_price', pa.float64()),
+    ('best_offer', pa.float64()),
+    ('reference_price', pa.float64()),
+    ('pricecharting_prices', pa.map_(pa.string(), pa.float64())),
+    ('volume', pa.string()),
+    ('pricecharting_url', pa.string()),
+])
+
+
+def get_partition_path(path: str, captured_at: datetime) -> str:
+    return os.path.join(path, f"date={captured_at:%Y-%m-%d}")
+
+
+class SnapshotWriter:
+    # one parquet file per sweep inside its date partition, one row group per page
+    def __init__(self, path: str = DEFAULT_SNAPSHOT_PATH, captured_at: datetime | None = None):
+        self.captured_at = (captured_at or datetime.now(timezone.utc)).replace(microsecond=0)
+        directory = get_partition_path(path, self.captured_at)
+        os.makedirs(directory, exist_ok=True)
+
+        self.path = os.path.join(directory, f"sweep-{self.captured_at:%H%M%S}-{os.getpid()}.parquet")
+        self.rows = 0
+        self._writer = None
+
+    def append(self, records: list, lookups: list, evaluation: dict) -> None:
+        if not records:
+            return
+
+        columns = {
+            'captured_at': [self.captured_at] * len(records),
+            'serial': [record.serial for record in records],
+            'proof_of_integrity': [record.proof_of_integrity for record in records],
+            'title': [record.name for record in records],
+            'card_title': [record.title for record in records],
+            'card_number': [record.card_number for record in records],
+            'set': [record.card_set for record in records],
+            'language': [record.language for record in records],
+            'first_edition': [record.first_edition for record in records],
+            'grader': [record.grader for record in records],
+            'grade': [record.grade for record in records],
+            'grade_number': [record.grade_number for record in records],
+            'courtyard_price': evaluation['listing_price'],
+            'best_offer': evaluation['best_offer'],
+            'reference_price': evaluation['reference_price'],
+            'pricecharting_prices': [list(lookup['prices'].items()) if lookup else None for lookup in lookups],
+            'volume': evaluation['volume'],
+            'pricecharting_url': [lookup['pricecharting_url'] if lookup else None for lookup in lookups],
+        }
+        table = pa.Table.from_pydict(
+            {name: pa.array(column, type=SNAPSHOT_SCHEMA.field(name).type, from_pandas=True)
+             for name, column in columns.items()},
+            schema=SNAPSHOT_SCHEMA
+        )
+
+        if self._writer is None:
+            self._writer = pq.ParquetWriter(self.path, SNAPSHOT_SCHEMA, compression=SNAPSHOT_COMPRESSION)
+        self._writer.write_table(table)
+        self.rows += len(records)
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def read_snapshots(path: str = DEFAULT_SNAPSHOT_PATH, date: str | None = None) -> pa.Table:
+    # `date` is YYYY-MM-DD; without it every partition is read
+    dataset = ds.dataset(path, format="parquet", partitioning="hive")
+    if date is None:
+        return dataset.to_table()
+    return dataset.to_table(filter=ds.field('date') == date)
@@ -0,0 +1,46 @@
+from alerts import AlertStore, BloomFilter, get_alert_key
+
+
+def test_bloom_filter_membership():
+    bloom_filter = BloomFilter(size=1024)
+    bloom_filter.add("a")
+
+    assert "a" in bloom_filter
+    assert "b" not in bloom_filter
+
+
+def test_reserved_alerts_are_not_queued_twice(tmp_path):
+    store = AlertStore(str(tmp_path / "alerts.sqlite3"))
+    key = get_alert_key("0x1", 'price', 10.0)
+
+    assert store.reserve(key)
+    assert not store.reserve(key)
+
+
+def test_only_confirmed_alerts_are_persisted(tmp_path):
+    path = str(tmp_path / "alerts.sqlite3")
+    store = AlertStore(path)
+    store.reserve("delivered")
+    store.confirm("delivered")
+    store.reserve("unsent")
+
+    reopened = AlertStore(path)
+    assert reopened.seen("delivered")
+    assert not reopened.reserve("delivered")
+    assert reopened.reserve("unsent")
+
+
+def test_released_alerts_can_be_sent_again(tmp_path):
+    store = AlertStore(str(tmp_path / "alerts.sqlite3"))
+    store.reserve("dropped")
+    store.release("dropped")
+
+    assert not store.seen("dropped")
+    assert store.reserve("dropped")
+
+
+def test_expired_alerts_are_sent_again(tmp_path):
+    store = AlertStore(str(tmp_path / "alerts.sqlite3"), ttl=-1)
+    store.add("old")
+
+    assert not store.seen("old")
@@ -0,0 +1,64 @@
+import fakeredis
+import redis
+
+import cache
+from cache import MemoryCache, SQLiteCache, TieredCache
+from redis_cache import RedisCache
+
+
+def test_memory_cache_expires_and_evicts():
+    memory = MemoryCache(max_entries=2)
+    memory.set_many({'a': {'n': 1}, 'b': {'n': 2}})
+    memory.get('a')
+    memory.set('c', {'n': 3})
+
+    assert memory.get_many(['a', 'b', 'c']) == [{'n': 1}, None, {'n': 3}]
+
+    expired = MemoryCache(expiration_time=-1)
+    expired.set('a', {'n': 1})
+    assert expired.get('a') is None
+
+
+def test_sqlite_cache_skips_expired_entries(tmp_path):
+    sqlite_cache = SQLiteCache(str(tmp_path / "cache.sqlite3"))
+    sqlite_cache.set_many({'a': {'n': 1}})
+    assert sqlite_cache.get_many(['a', 'missing']) == [{'n': 1}, None]
+
+    expired = SQLiteCache(str(tmp_path / "expired.sqlite3"), expiration_time=-1)
+    expired.set('a', {'n': 1})
+    assert expired.get('a') is None
+
+
+def test_tiered_cache_promotes_hits(tmp_path):
+    memory = MemoryCache()
+    backend = SQLiteCache(str(tmp_path / "cache.sqlite3"))
+    backend.set('a', {'n': 1})
+    tiered = TieredCache(memory, backend)
+
+    assert tiered.get_many(['a', 'missing']) == [{'n': 1}, None]
+    assert memory.get('a') == {'n': 1}
+    assert tiered.stats['SQLiteCache'] == {'hits': 1, 'misses': 1}
+
+
+def test_get_cache_uses_redis_with_json_support(monkeypatch):
+    monkeypatch.setattr(redis.Redis, 'from_url', lambda *args, **kwargs: fakeredis.FakeRedis())
+
+    assert isinstance(cache.get_cache().tiers[-1], RedisCache)
+
+
+def test_get_cache_falls_back_to_sqlite(monkeypatch, tmp_path):
+    monkeypatch.setenv('REDIS_URL', "redis://127.0.0.1:1")
+    monkeypatch.setenv('CACHE_PATH', str(tmp_path / "cache.sqlite3"))
+
+    assert isinstance(cache.get_cache().tiers[-1], SQLiteCache)
+
+
+def test_get_cache_falls_back_without_redis_json(monkeypatch, tmp_path):
+    class PlainRedis(fakeredis.FakeRedis):
+        def json(self):
+            raise redis.exceptions.ResponseError("unknown command 'JSON.GET'")
+
+    monkeypatch.setattr(redis.Redis, 'from_url', lambda *args, **kwargs: PlainRedis())
+    monkeypatch.setenv('CACHE_PATH', str(tmp_path / "cache.sqlite3"))
+
+    assert isinstance(cache.get_cache().tiers[-1], SQLiteCache)
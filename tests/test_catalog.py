@@ -0,0 +1,29 @@
+from catalog import ProductCatalog, tokenize
+
+ROWS = [
+    ("https://www.pricecharting.com/game/pokemon-base-set/pikachu-58", "Pikachu #58", "Pokemon Base Set"),
+    ("https://www.pricecharting.com/game/pokemon-jungle/pikachu-60", "Pikachu #60", "Pokemon Jungle"),
+]
+
+
+def test_tokenize():
+    assert tokenize("Pikachu #58 1st Edition") == ["pikachu", "58", "1st", "edition"]
+
+
+def test_find_products_matches_every_token(tmp_path):
+    catalog = ProductCatalog(str(tmp_path / "catalog.sqlite3"))
+    catalog.add_products(ROWS)
+
+    assert catalog.find_products(["pikachu", "58"]) == [ROWS[0]]
+    assert sorted(catalog.find_products(["pikachu"])) == sorted(ROWS)
+    assert catalog.find_products(["charizard"]) == []
+    assert catalog.find_products([]) == []
+
+
+def test_resolved_urls_round_trip(tmp_path):
+    path = str(tmp_path / "catalog.sqlite3")
+    ProductCatalog(path).set_resolved("card:pikachu|58", ROWS[0][0])
+
+    catalog = ProductCatalog(path)
+    assert catalog.get_resolved("card:pikachu|58") == ROWS[0][0]
+    assert catalog.get_resolved("card:missing") is None
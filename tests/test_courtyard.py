@@ -0,0 +1,74 @@
+import io
+import json
+import re
+
+import pytest
+
+import courtyard
+import http_client
+
+QUERY_URL = "https://courtyard.io/marketplace?sortBy=listingDate%3Adesc&page=1&Category=Pok%C3%A9mon"
+
+
+class Raw(io.BytesIO):
+    decode_content = False
+
+
+class Response:
+    def __init__(self, body: bytes):
+        self.raw = Raw(body)
+        self.closed = False
+
+    def raise_for_status(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+def page(*serials):
+    return json.dumps({'assets': [{'serial': serial, 'price': 1.5} for serial in serials], 'total': 3}).encode()
+
+
+def test_streams_assets_from_the_body(monkeypatch):
+    response = Response(page("1", "2"))
+    monkeypatch.setattr(http_client, 'get', lambda url, **kwargs: response)
+
+    assets = list(courtyard.stream_courtyard_assets("https://api.test/index/query"))
+
+    assert assets == [{'serial': "1", 'price': 1.5}, {'serial': "2", 'price': 1.5}]
+    assert isinstance(assets[0]['price'], float)
+    assert response.raw.decode_content and response.closed
+
+
+def test_malformed_bodies_raise_value_error(monkeypatch):
+    monkeypatch.setattr(http_client, 'get', lambda url, **kwargs: Response(b'{"assets": [{"serial": '))
+
+    with pytest.raises(ValueError):
+        list(courtyard.stream_courtyard_assets("https://api.test/index/query"))
+
+
+def test_pages_advance_by_the_assets_received(monkeypatch):
+    # the API hands back fewer assets than asked for, and the query ends at an empty page
+    pages = {0: page("1", "2"), 2: page("3"), 3: page()}
+    offsets = []
+
+    def get(url, **kwargs):
+        offsets.append(int(re.search(r"offset=(\d+)", url)[1]))
+        return Response(pages[offsets[-1]])
+
+    monkeypatch.setattr(http_client, 'get', get)
+
+    assert [asset['serial'] for asset in courtyard.iter_courtyard_assets_streaming(QUERY_URL)] == ["1", "2", "3"]
+    assert offsets == [0, 2, 3]
+
+
+def test_closing_early_drops_the_response(monkeypatch):
+    response = Response(page("1", "2"))
+    monkeypatch.setattr(http_client, 'get', lambda url, **kwargs: response)
+
+    assets = courtyard.iter_courtyard_assets_streaming(QUERY_URL)
+    next(assets)
+    assets.close()
+
+    assert response.closed
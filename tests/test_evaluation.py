@@ -0,0 +1,45 @@
+from types import SimpleNamespace
+
+import numpy as np
+
+from evaluation import evaluate_page, join_reference_data
+
+CHARIZARD = {
+    'prices': {'PSA 10': 130.0, 'Grade 9.5': 110.0, 'PSA 9': None},
+    'liquidity_info': ["1", "2", "3", "4", "5", "6"],
+}
+
+
+def record(grader, grade_label, price, best_offer=0):
+    return SimpleNamespace(grader=grader, grade_label=grade_label, price=price, best_offer=best_offer)
+
+
+RECORDS = [record("PSA", "10", 100), record("BGS", "9.5", 100), record("PSA", "10", 100, 120), record("PSA", "9", 50)]
+LOOKUPS = [CHARIZARD, CHARIZARD, None, CHARIZARD]
+
+
+def test_joins_prices_and_volumes_per_grading():
+    resolved, reference_prices, volume = join_reference_data(RECORDS, LOOKUPS)
+
+    assert resolved.tolist() == [True, True, False, True]
+    # BGS 9.5 has no column of its own and falls back to the grade-only price
+    assert reference_prices[[0, 1]].tolist() == [130.0, 110.0]
+    assert np.isnan(reference_prices[2]) and np.isnan(reference_prices[3])
+    assert volume.tolist() == ["6", "5", None, "4"]
+
+
+def test_flags_deals_and_offers():
+    evaluation = evaluate_page(RECORDS, LOOKUPS, 0.15)
+
+    assert evaluation['deal'].tolist() == [True, False, False, False]
+    assert evaluation['priced'].tolist() == [True, True, False, False]
+    # offers only need the Courtyard prices, so unresolved listings are still checked
+    assert evaluation['offer'].tolist() == [False, False, True, False]
+
+
+def test_smoothed_prices_replace_live_ones_where_known():
+    smoothed_prices = np.array([np.nan, 200.0, np.nan, np.nan])
+    evaluation = evaluate_page(RECORDS, LOOKUPS, 0.15, smoothed_prices)
+
+    assert evaluation['deal'].tolist() == [True, True, False, False]
+    assert evaluation['live_reference_price'][1] == 110.0
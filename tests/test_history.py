@@ -0,0 +1,40 @@
+from types import SimpleNamespace
+
+from history import COURTYARD, DAY, PriceHistory
+
+
+def listing(card_key, price, serial, grading="PSA 10"):
+    return SimpleNamespace(card_key=card_key, grading=grading, price=price, serial=serial)
+
+
+def test_keeps_every_listing_of_a_page(tmp_path):
+    history = PriceHistory(str(tmp_path / "history.sqlite3"))
+    history.record_courtyard([listing("card:a", 10, "1"), listing("card:a", 12, "2"), listing("card:a", 14, "3")])
+
+    assert history.median("card:a", "PSA 10", source=COURTYARD) == 12
+    assert len(history.window("card:a", "PSA 10", 1, source=COURTYARD)) == 3
+
+
+def test_median_and_trend_of_pricecharting_prices(tmp_path, monkeypatch):
+    history = PriceHistory(str(tmp_path / "history.sqlite3"))
+    now = 1_000_000_000
+    monkeypatch.setattr('time.time', lambda: now)
+    history.record_pricecharting({
+        "card:a": {'fetched_at': now - 2 * DAY, 'prices': {'PSA 10': 100.0, 'Ungraded': None}},
+    })
+    history.record_pricecharting({"card:a": {'fetched_at': now - DAY, 'prices': {'PSA 10': 110.0}}})
+    history.record_pricecharting({"card:a": {'fetched_at': now, 'prices': {'PSA 10': 120.0}}})
+
+    assert history.median("card:a", "PSA 10") == 110.0
+    assert abs(history.trend("card:a", "PSA 10") - 10.0) < 1e-6
+    assert history.latest("card:a", "PSA 10") == (120.0, now)
+    assert history.median("card:a", "Ungraded") is None
+
+
+def test_popular_cards_counts_listings(tmp_path):
+    history = PriceHistory(str(tmp_path / "history.sqlite3"))
+    history.record_courtyard([listing("card:a", 1, "1"), listing("card:b", 1, "2"), listing("card:b", 1, "3")])
+
+    assert history.popular_cards() == ["card:b", "card:a"]
+    assert history.popular_cards(limit=1) == ["card:b"]
+
@@ -0,0 +1,81 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import http_client
+import notifications
+from alerts import AlertStore
+from notifications import MAX_EMBEDS_PER_MESSAGE, DiscordDispatcher
+
+WEBHOOK_URL = "https://discord.test/webhooks/1/token"
+
+
+def response(status_code, headers=None):
+    return SimpleNamespace(status_code=status_code, headers=headers or {}, content=b"")
+
+
+def idle_dispatcher(monkeypatch):
+    # the worker thread exits at once so tests drive _send_batch themselves
+    monkeypatch.setattr(DiscordDispatcher, '_run', lambda self: None)
+    return DiscordDispatcher()
+
+
+def queued(dispatcher):
+    items = []
+    while not dispatcher._queue.empty():
+        items.append(dispatcher._queue.get_nowait())
+    return items
+
+
+def test_batches_queued_embeds_per_message(monkeypatch):
+    entered, release = threading.Event(), threading.Event()
+    sizes = []
+
+    def post_webhook(url, json):
+        sizes.append(len(json['embeds']))
+        entered.set()
+        release.wait(5)
+        return response(204)
+
+    monkeypatch.setattr(http_client, 'post_webhook', post_webhook)
+    dispatcher = DiscordDispatcher()
+    dispatcher.send(WEBHOOK_URL, {'title': "0"})
+    assert entered.wait(5)
+    for i in range(MAX_EMBEDS_PER_MESSAGE + 1):
+        dispatcher.send(WEBHOOK_URL, {'title': str(i + 1)})
+    release.set()
+    dispatcher.flush(5)
+
+    assert sizes == [1, MAX_EMBEDS_PER_MESSAGE, 1]
+
+
+def test_rate_limited_batches_wait_for_retry_after(monkeypatch):
+    monkeypatch.setattr(http_client, 'post_webhook', lambda url, json: response(429, {'Retry-After': '30'}))
+    dispatcher = idle_dispatcher(monkeypatch)
+    dispatcher._send_batch(WEBHOOK_URL, [(WEBHOOK_URL, {'title': "a"}, None, 0)])
+
+    assert [item[3] for item in queued(dispatcher)] == [1]
+    assert dispatcher._reset_at[WEBHOOK_URL] - time.monotonic() > 29
+
+
+def test_failed_batches_back_off_before_retrying(monkeypatch):
+    monkeypatch.setattr(http_client, 'post_webhook', lambda url, json: response(503))
+    monkeypatch.setattr(http_client, 'get_backoff', lambda attempt: 10 * 2 ** attempt)
+    dispatcher = idle_dispatcher(monkeypatch)
+    dispatcher._send_batch(WEBHOOK_URL, [(WEBHOOK_URL, {'title': "a"}, None, 2)])
+
+    assert [item[3] for item in queued(dispatcher)] == [3]
+    assert dispatcher._reset_at[WEBHOOK_URL] - time.monotonic() > 39
+
+
+def test_rejected_batches_are_dropped_and_released(tmp_path, monkeypatch):
+    store = AlertStore(str(tmp_path / "alerts.sqlite3"))
+    monkeypatch.setattr(notifications, 'get_alert_store', lambda: store)
+    monkeypatch.setattr(http_client, 'post_webhook', lambda url, json: response(404))
+    dispatcher = idle_dispatcher(monkeypatch)
+    assert store.reserve("key")
+    dispatcher._send_batch(WEBHOOK_URL, [(WEBHOOK_URL, {'title': "a"}, "key", 0)])
+
+    assert queued(dispatcher) == []
+    assert WEBHOOK_URL not in dispatcher._reset_at
+    assert store.reserve("key")
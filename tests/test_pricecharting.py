@@ -0,0 +1,48 @@
+from pricecharting import extract_pricecharting_information, parse_search_results, select_product_url
+
+PRODUCT_PAGE = b"""<html><body>
+<div id="product_details"><img src="https://img.test/charizard.jpg"></div>
+<div id="full-prices"><table>
+  <tr><th>Grade</th><th>Price</th></tr>
+  <tr><td>Ungraded</td><td>$120.50</td></tr>
+  <tr><td>PSA 10</td><td>$950.00</td></tr>
+  <tr><td>Grade 9.5</td><td>-</td></tr>
+</table></div>
+<table><tr class="sales_volume odd"><td>Volume</td><td><a>5</a></td><td><a>2</a></td></tr></table>
+</body></html>"""
+
+SEARCH_PAGE = b"""<html><body><table id="games_table"><tbody>
+  <tr id="product-1">
+    <td><a href=" https://www.pricecharting.com/game/pokemon-base-set/charizard-4 ">img</a></td>
+    <td><a> Charizard #4 </a></td>
+    <td> Pokemon Base Set </td>
+  </tr>
+  <tr id="product-2">
+    <td><a href="https://www.pricecharting.com/game/pokemon-japanese-base-set/charizard-6">img</a></td>
+    <td><a>Charizard #4</a></td>
+    <td>Pokemon Japanese Base Set</td>
+  </tr>
+  <tr id="ad-row"><td>sponsored</td></tr>
+</tbody></table></body></html>"""
+
+ATTRIBUTES = {'Title': "Charizard", 'Card Number': "4", 'Set': "Base Set", 'Language': "English", '1st Edition': False}
+
+
+def test_extracts_prices_image_and_volume():
+    information = extract_pricecharting_information("https://pc.test/game/x", PRODUCT_PAGE, {'ETag': '"abc"'})
+
+    assert information['prices'] == {'Ungraded': 120.5, 'PSA 10': 950.0, 'Grade 9.5': None}
+    assert information['card_img'] == "https://img.test/charizard.jpg"
+    assert information['liquidity_info'] == ["5", "2"]
+    assert information['etag'] == '"abc"'
+
+
+def test_search_rows_are_stripped_and_filtered():
+    rows = parse_search_results(SEARCH_PAGE)
+
+    assert rows[0] == ("https://www.pricecharting.com/game/pokemon-base-set/charizard-4", "Charizard #4",
+                       "Pokemon Base Set")
+    assert len(rows) == 2
+    assert select_product_url(rows, ATTRIBUTES) == rows[0][0]
+    assert select_product_url(rows, {**ATTRIBUTES, 'Language': "Japanese"}) == rows[1][0]
+    assert parse_search_results(b"<html><body></body></html>") == []
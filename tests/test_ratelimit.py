@@ -0,0 +1,59 @@
+from email.utils import formatdate
+import time
+
+from ratelimit import MULTIPLICATIVE_DECREASE, RateLimiter, get_limiter, parse_retry_after
+
+
+def test_parse_retry_after():
+    assert parse_retry_after("2") == 2
+    assert parse_retry_after("-1") == 0
+    assert 8 <= parse_retry_after(formatdate(time.time() + 10, usegmt=True)) <= 10
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("soon") is None
+
+
+def test_slow_start_until_throttled():
+    limiter = RateLimiter("example.com", rate=2, max_rate=10)
+    limiter.record(200)
+    limiter.record(200)
+    assert limiter.rate == 4
+
+    limiter.record(429)
+    assert limiter.rate == 4 * MULTIPLICATIVE_DECREASE
+    assert limiter.throttled == 1
+
+    # past slow start the rate only grows additively
+    limiter.record(200)
+    assert 2 < limiter.rate < 3
+
+
+def test_rate_stays_within_bounds():
+    limiter = RateLimiter("example.com", rate=1, max_rate=3, min_rate=0.5)
+    for _ in range(10):
+        limiter.record(200)
+    assert limiter.rate == 3
+
+    for _ in range(10):
+        limiter.record(503)
+    assert limiter.rate == 0.5
+
+
+def test_reserve_spaces_requests_once_the_burst_is_spent():
+    limiter = RateLimiter("example.com", rate=10, burst=2)
+
+    assert limiter.reserve() == 0
+    assert limiter.reserve() == 0
+    assert 0.05 < limiter.reserve() <= 0.1
+
+
+def test_retry_after_pauses_the_host():
+    limiter = RateLimiter("example.com", rate=10)
+    limiter.record(429, "2")
+
+    # the pause comes on top of the spacing at the halved rate
+    assert 1.9 < limiter.reserve() <= 2 + 1 / limiter.rate
+
+
+def test_limiters_are_shared_per_host():
+    assert get_limiter("a.example.com") is get_limiter("a.example.com")
+    assert get_limiter("a.example.com") is not get_limiter("b.example.com")
@@ -0,0 +1,59 @@
+from records import CardRecord, format_card_key, normalize_card_number
+
+
+def asset(attributes, price=100.0, offers=(), proof_of_integrity="0xabc"):
+    return {
+        'attributes': [{'name': name, 'value': value} for name, value in attributes.items()],
+        'listing_data': [{'price': {'amount': {'usd': price}}}],
+        'offer_data': [{'price': {'netAmount': {'usd': offer}}} for offer in offers],
+        'proof_of_integrity': proof_of_integrity,
+        'title': "PSA 10 Charizard",
+    }
+
+
+CHARIZARD = {
+    'Title': "Charizard",
+    'Card Number': "004/102",
+    'Set': "Base Set",
+    'Language': "English",
+    'Grader': "PSA",
+    'Grade': "9.5 MINT+",
+    'Serial': "12345678",
+    '': "1st Edition",  # Courtyard leaves the edition attribute unnamed
+}
+
+
+def test_parses_attributes_price_and_offers():
+    record = CardRecord(asset(CHARIZARD, price=250.0, offers=(200.0, 260.0)))
+
+    assert record.title == "Charizard"
+    assert record.card_number == "4/102"
+    assert record.first_edition
+    assert record.grade_number == 9.5
+    assert record.grading == "PSA 9.5"
+    assert (record.price, record.best_offer) == (250.0, 260.0)
+    assert record.courtyard_url == "https://courtyard.io/asset/0xabc"
+
+
+def test_reads_like_the_attribute_dict():
+    record = CardRecord(asset({'Pokémon Title': "Pikachu", 'Language': "Japanese"}))
+
+    assert record['Title'] == "Pikachu"
+    assert 'Set' not in record
+    assert record.get('Set', "") == ""
+    assert not record.first_edition
+    assert record.grade_number is None
+
+
+def test_key_uses_the_raw_card_number():
+    assert CardRecord(asset(CHARIZARD), lambda number: number.split("/")[0]).card_key == \
+        CardRecord(asset(CHARIZARD)).card_key
+
+
+def test_card_keys_ignore_case_spacing_and_zero_padding():
+    assert format_card_key("Charizard ", "004/102", "Base  Set", "English", True) == \
+        format_card_key("charizard", "4/102", "base set", "ENGLISH", True)
+    assert normalize_card_number("SWSH050") == "swsh50"
+    assert normalize_card_number("100") == "100"
+    assert format_card_key("Charizard", "4", "Base Set", "English", True) != \
+        format_card_key("Charizard", "4", "Base Set", "English", False)
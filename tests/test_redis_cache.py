@@ -0,0 +1,60 @@
+import asyncio
+
+import fakeredis
+import pytest
+
+from redis_cache import AsyncRedisCache, RedisCache
+
+
+@pytest.fixture
+def client():
+    return fakeredis.FakeRedis()
+
+
+def test_get_many_returns_none_for_missing_keys(client):
+    cache = RedisCache(client=client)
+    cache.set_many({'card:a': {'prices': {'PSA 10': 100.0}}})
+
+    assert cache.get_many(['card:a', 'card:missing']) == [{'prices': {'PSA 10': 100.0}}, None]
+    assert cache.get('card:missing') is None
+    assert cache.get_many([]) == []
+
+
+def test_set_many_expires_every_key(client):
+    cache = RedisCache(client=client, expiration_time=60)
+    cache.set_many({'card:a': {'n': 1}, 'card:b': {'n': 2}})
+
+    assert 0 < client.ttl('card:a') <= 60
+    assert 0 < client.ttl('card:b') <= 60
+
+
+def test_set_overwrites_and_refreshes_ttl(client):
+    cache = RedisCache(client=client, expiration_time=60)
+    cache.set('card:a', {'n': 1})
+    client.expire('card:a', 5)
+    cache.set('card:a', {'n': 2})
+
+    assert cache.get('card:a') == {'n': 2}
+    assert client.ttl('card:a') > 5
+
+
+def test_async_cache_round_trip():
+    async def run():
+        client = fakeredis.FakeAsyncRedis()
+        cache = AsyncRedisCache(client=client, expiration_time=60)
+        await cache.set_many({'card:a': {'n': 1}})
+        await cache.set('card:b', {'n': 2})
+
+        results = await cache.get_many(['card:a', 'card:missing', 'card:b'])
+        single = await cache.get('card:missing')
+        ttl = await client.ttl('card:a')
+        empty = await cache.get_many([])
+        await cache.close()
+        return results, single, ttl, empty
+
+    results, single, ttl, empty = asyncio.run(run())
+
+    assert results == [{'n': 1}, None, {'n': 2}]
+    assert single is None
+    assert 0 < ttl <= 60
+    assert empty == []
@@ -0,0 +1,55 @@
+import os
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import numpy as np
+
+from snapshot import SnapshotWriter, read_snapshots
+
+CAPTURED_AT = datetime(2026, 10, 18, 12, 30, 15, tzinfo=timezone.utc)
+CHARIZARD = {'prices': {'PSA 10': 130.0, 'PSA 9': None}, 'pricecharting_url': "https://pc.test/game/charizard"}
+
+
+def record(serial, grade_number):
+    return SimpleNamespace(
+        serial=serial, proof_of_integrity=f"0x{serial}", name=f"Charizard #{serial}", title="Charizard",
+        card_number="4", card_set="Base Set", language="English", first_edition=False, grader="PSA",
+        grade=f"{grade_number} GEM MINT", grade_number=float(grade_number),
+    )
+
+
+def evaluation(listing_prices, reference_prices, volume):
+    return {
+        'listing_price': np.array(listing_prices),
+        'best_offer': np.zeros(len(listing_prices)),
+        'reference_price': np.array(reference_prices),
+        'volume': np.array(volume, dtype=object),
+    }
+
+
+def test_writes_one_partitioned_file_per_sweep(tmp_path):
+    with SnapshotWriter(str(tmp_path), CAPTURED_AT) as snapshot:
+        snapshot.append([record("1", 10), record("2", 9)], [CHARIZARD, None],
+                        evaluation([100.0, 90.0], [130.0, np.nan], ["6", None]))
+        snapshot.append([], [], evaluation([], [], []))
+        snapshot.append([record("3", 10)], [CHARIZARD], evaluation([110.0], [130.0], ["6"]))
+
+    assert snapshot.rows == 3
+    assert os.path.dirname(snapshot.path) == str(tmp_path / "date=2026-10-18")
+    assert os.listdir(tmp_path / "date=2026-10-18") == [os.path.basename(snapshot.path)]
+
+    rows = read_snapshots(str(tmp_path), "2026-10-18").to_pylist()
+    assert [row['serial'] for row in rows] == ["1", "2", "3"]
+    # NaN reference prices and missing lookups become nulls
+    assert rows[1]['reference_price'] is None and rows[1]['pricecharting_url'] is None
+    assert rows[0]['pricecharting_prices'] == [('PSA 10', 130.0), ('PSA 9', None)]
+    assert rows[0]['grade_number'] == 10.0
+    assert rows[0]['captured_at'] == CAPTURED_AT
+
+
+def test_sweeps_without_listings_write_nothing(tmp_path):
+    with SnapshotWriter(str(tmp_path), CAPTURED_AT) as snapshot:
+        pass
+
+    assert snapshot.rows == 0
+    assert not os.path.exists(snapshot.path)
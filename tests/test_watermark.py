@@ -0,0 +1,20 @@
+from watermark import WatermarkStore, get_query_key
+
+
+def test_query_key_ignores_page_number():
+    assert get_query_key("https://courtyard.io/marketplace?page=3&Grader=PSA") == "Grader=PSA"
+    assert get_query_key("https://courtyard.io/marketplace?Grader=PSA&page=1") == "Grader=PSA"
+
+
+def test_watermarks_persist_per_query(tmp_path):
+    path = str(tmp_path / "watermarks.sqlite3")
+    store = WatermarkStore(path)
+    assert store.get("Grader=PSA") is None
+
+    store.set("Grader=PSA", "123")
+    store.set("Grader=PSA", "124")
+    store.set("Grader=BGS", "7")
+
+    reopened = WatermarkStore(path)
+    assert reopened.get("Grader=PSA") == "124"
+    assert reopened.get("Grader=BGS") == "7"
@@ -0,0 +1,36 @@
+import os
+import re
+import sqlite3
+import time
+
+DEFAULT_WATERMARK_PATH = os.path.join(".cache", "watermarks.sqlite3")
+
+
+def get_query_key(courtyard_url: str) -> str:
+    # the marketplace filters without the page number identify a query
+    return re.sub(r"(^|&|\?)page=\d+", "", courtyard_url.split("?", 1)[-1]).strip("&")
+
+
+class WatermarkStore:
+    def __init__(self, path: str = DEFAULT_WATERMARK_PATH):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._connection = sqlite3.connect(path)
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS watermarks (query TEXT PRIMARY KEY, serial TEXT NOT NULL, updated_at REAL NOT NULL)"
+        )
+        self._connection.commit()
+
+    def get(self, query: str) -> str | None:
+        row = self._connection.execute("SELECT serial FROM watermarks WHERE query = ?", (query,)).fetchone()
+        if row:
+            return row[0]
+
+    def set(self, query: str, serial: str) -> None:
+        self._connection.execute(
+            "INSERT OR REPLACE INTO watermarks (query, serial, updated_at) VALUES (?, ?, ?)",
+            (query, serial, time.time())
+        )
+        self._connection.commit()